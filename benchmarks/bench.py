@@ -0,0 +1,180 @@
+"""
+Benchmarks for the Base and Drive hot paths, run against :class:`deta.testing.LocalDeta`.
+
+The stand-in server runs in its own process and every scenario runs in a fresh
+interpreter, so peak RSS is reported per scenario. Results are printed as JSON lines.
+
+Usage::
+
+    python benchmarks/bench.py                     # all scenarios
+    python benchmarks/bench.py --quick             # smaller sizes, for a smoke run
+    python benchmarks/bench.py --filter base.put   # scenarios whose name contains the text
+    python benchmarks/bench.py --output results.jsonl
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deta  # noqa: E402
+from deta.testing import LocalDeta  # noqa: E402
+
+KB = 1024
+MB = 1024 * KB
+
+
+def scenarios(quick: bool) -> Dict[str, Dict[str, Any]]:
+    scale = 10 if quick else 1
+    found = {}
+    for record_size in (100, KB, 10 * KB):
+        for batch_size in (1, 25):
+            for concurrency in (1, 8):
+                name = f'base.put/record={record_size}/batch={batch_size}/concurrency={concurrency}'
+                found[name] = {
+                    'kind': 'base.put', 'record_size': record_size, 'batch_size': batch_size,
+                    'concurrency': concurrency, 'ops': 2000 // batch_size // scale or 1,
+                }
+    for records in (1000 // scale, 20000 // scale):
+        for record_size in (100, KB):
+            name = f'base.fetch_all/records={records}/record={record_size}'
+            found[name] = {'kind': 'base.fetch_all', 'records': records, 'record_size': record_size, 'ops': 5}
+    for file_size in (KB, MB, 25 * MB):
+        for concurrency in (1, 4):
+            mode = 'chunked' if file_size > deta.drive.MAX_UPLOAD_SIZE else 'direct'
+            ops = max(4, (200 if file_size < MB else 16 if file_size == MB else 4) // scale)
+            found[f'drive.put/{mode}/size={file_size}/concurrency={concurrency}'] = {
+                'kind': 'drive.put', 'file_size': file_size, 'concurrency': concurrency, 'ops': ops,
+            }
+            found[f'drive.get/size={file_size}/concurrency={concurrency}'] = {
+                'kind': 'drive.get', 'file_size': file_size, 'concurrency': concurrency, 'ops': ops,
+            }
+    return found
+
+
+def serve(port_queue: multiprocessing.Queue):
+    async def main():
+        async with LocalDeta() as server:
+            port_queue.put(server.port)
+            await asyncio.Event().wait()
+    asyncio.run(main())
+
+
+async def timed(func: Callable[[int], Awaitable[Any]], ops: int, concurrency: int) -> List[float]:
+    latencies = []
+    counter = iter(range(ops))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            await func(i)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run(name: str, params: Dict[str, Any], url: str) -> Dict[str, Any]:
+    kind, ops = params['kind'], params['ops']
+    concurrency = params.get('concurrency', 1)
+    units = 1
+    async with deta.Deta('bench_key', base_host=url, drive_host=url) as service:
+        if kind == 'base.put':
+            base = service.base('put')
+            size, batch = params['record_size'], params['batch_size']
+            units = batch
+
+            async def op(i: int):
+                await base.put(*(deta.Record(key=f'{i}-{j}', data='x' * size) for j in range(batch)))
+        elif kind == 'base.fetch_all':
+            size = params['record_size']
+            base = service.base(f"fetch_all-{params['records']}-{size}")
+            records = (deta.Record(key=f'{i:08d}', data='x' * size) for i in range(params['records']))
+            await base.put_many(records, concurrency=8)
+            units = params['records']
+
+            async def op(_: int):
+                await base.fetch_all()
+        elif kind == 'drive.put':
+            drive = service.drive('put')
+            content = os.urandom(params['file_size'])
+
+            async def op(i: int):
+                await drive.put(content, save_as=f'file-{i}')
+        else:
+            drive = service.drive('get')
+            await drive.put(os.urandom(params['file_size']), save_as='file')
+
+            async def op(_: int):
+                stream = await drive.get('file')
+                await stream.read()
+
+        start = time.perf_counter()
+        latencies = await timed(op, ops, concurrency)
+        elapsed = time.perf_counter() - start
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'name': name,
+        **params,
+        'ops_per_sec': round(len(latencies) / elapsed, 2),
+        'units_per_sec': round(len(latencies) * units / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        'peak_rss_mb': round(max_rss / (MB if sys.platform == 'darwin' else KB), 2),
+        'deta_version': deta.__version__,
+        'python': sys.version.split()[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help='run smaller workloads')
+    parser.add_argument('--filter', default='', help='only run scenarios whose name contains this text')
+    parser.add_argument('--output', help='append results to this file as well')
+    parser.add_argument('--scenario', help=argparse.SUPPRESS)
+    parser.add_argument('--url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    found = scenarios(args.quick)
+
+    if args.scenario:
+        print(json.dumps(asyncio.run(run(args.scenario, found[args.scenario], args.url))))
+        return
+
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(port_queue,), daemon=True)
+    server.start()
+    url = f'http://127.0.0.1:{port_queue.get(timeout=30)}'
+    output = open(args.output, 'a') if args.output else None
+    try:
+        for name in found:
+            if args.filter not in name:
+                continue
+            command = [sys.executable, os.path.abspath(__file__), '--scenario', name, '--url', url]
+            if args.quick:
+                command.append('--quick')
+            line = subprocess.run(command, check=True, capture_output=True, text=True).stdout.strip()
+            print(line, flush=True)
+            if output:
+                output.write(line + '\n')
+    finally:
+        if output:
+            output.close()
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Startup benchmarks guarding the cold start of short-lived processes.
+
+Measures in fresh interpreters how long ``import deta`` takes, that it does not import aiohttp,
+and how long creating a client and sending the first request to :class:`deta.testing.LocalDeta` takes.
+Results are printed as JSON lines, the exit status is 1 if a budget is exceeded.
+
+Usage::
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 20 --max-import-ms 150 --max-first-request-ms 400
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT = """
+import sys, time
+start = time.perf_counter()
+import deta
+elapsed = time.perf_counter() - start
+print(elapsed, 'aiohttp' in sys.modules)
+"""
+
+FIRST_REQUEST = """
+import asyncio, sys, time
+start = time.perf_counter()
+import deta
+
+async def main():
+    async with deta.Deta('bench_key', base_host=sys.argv[1]) as client:
+        await client.base('startup').put(deta.Record(key='1'))
+
+asyncio.run(main())
+print(time.perf_counter() - start, True)
+"""
+
+
+def serve(port_queue: multiprocessing.Queue):
+    sys.path.insert(0, ROOT)
+    from deta.testing import LocalDeta
+
+    async def main():
+        async with LocalDeta() as server:
+            port_queue.put(server.port)
+            await asyncio.Event().wait()
+    asyncio.run(main())
+
+
+def measure(code: str, runs: int, *args: str):
+    timings, flags = [], set()
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')]))}
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', code, *args], check=True, capture_output=True, text=True, env=env
+        ).stdout.split()
+        timings.append(float(output[0]) * 1000)
+        flags.add(output[1] == 'True')
+    return statistics.median(timings), max(timings), flags
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters per measurement')
+    parser.add_argument('--max-import-ms', type=float, help='budget for the median import time')
+    parser.add_argument('--max-first-request-ms', type=float, help='budget for the median time to the first response')
+    args = parser.parse_args()
+    failed = False
+
+    median, worst, flags = measure(IMPORT, args.runs)
+    imports_aiohttp = True in flags
+    print(json.dumps({
+        'name': 'startup.import', 'median_ms': round(median, 3), 'max_ms': round(worst, 3),
+        'imports_aiohttp': imports_aiohttp,
+    }), flush=True)
+    if imports_aiohttp or (args.max_import_ms and median > args.max_import_ms):
+        failed = True
+
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(port_queue,), daemon=True)
+    server.start()
+    try:
+        url = f'http://127.0.0.1:{port_queue.get(timeout=30)}'
+        median, worst, _ = measure(FIRST_REQUEST, args.runs, url)
+    finally:
+        server.terminate()
+    print(json.dumps({
+        'name': 'startup.first_request', 'median_ms': round(median, 3), 'max_ms': round(worst, 3),
+    }), flush=True)
+    if args.max_first_request_ms and median > args.max_first_request_ms:
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
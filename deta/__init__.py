@@ -16,6 +16,13 @@ __author__ = "Sougata Jana"
 __version__ = "0.0.7a"
 
 from .deta import Deta, Base, Drive
+from .sync import SyncDeta, SyncBase, SyncDrive
+from .cache import Cache, QueryCache
+from .buffer import BufferedWriter, UpdateCoalescer
+from .retry import RetryPolicy
+from .http import PoolConfig
+from .limiter import AdaptiveLimiter
+from .metrics import RequestEvent, MetricsCollector
 from .errors import (
     Unauthorized,
     NotFound,
@@ -25,4 +32,4 @@ from .errors import (
     DetaUnknownError,
     IncompleteUpload
 )
-from .utils import Record, Updater, Query
+from .utils import Record, Updater, Query, PreparedQuery
@@ -1,8 +1,27 @@
-from aiohttp import ClientSession
-from typing import List, Optional, Dict, Any, Tuple
+import array
+import os
+import time
+import asyncio
+from itertools import islice
+from typing import (
+    List, Optional, Dict, Any, Tuple, Union, Iterable, AsyncIterable, AsyncIterator, Sequence, Hashable, Callable,
+    Awaitable, BinaryIO, Set, TYPE_CHECKING
+)
 
+from .buffer import BufferedWriter, UpdateCoalescer
+from .cache import Cache, QueryCache, _MISSING, _NOT_FOUND, _FRESH, _STALE
 from .errors import *
-from .utils import Record, Updater, Query
+from .http import HTTPClient
+from .utils import (
+    Record, Updater, Query, PreparedQuery, _Columns, _batched, _gather_bounded, _stable_dumps, _read_checkpoint,
+    _write_checkpoint, _remove_checkpoint
+)
+
+if TYPE_CHECKING:
+    from aiohttp import ClientSession, ClientResponse
+
+BASE_HOST = 'https://database.deta.sh'
+MAX_PUT_BATCH = 25
 
 
 class Base:
@@ -15,23 +34,147 @@ class Base:
         Name of the base
     project_id : str
         Project ID to be used for requests
-    session : aiohttp.ClientSession
-        External client session to be used for requests
+    session : aiohttp.ClientSession | None
+        External client session to be used for requests, the one of ``http`` is used if not provided
+    cache : Cache | None
+        Cache to serve :meth:`get` from, invalidated by writes through this instance
+    query_cache : QueryCache | None
+        Cache to serve :meth:`fetch` from, invalidated by writes through this instance
+    coalesce : bool
+        Whether concurrent identical :meth:`get` and :meth:`fetch` calls share one in-flight request
+        (defaults to False). Callers then receive the same result object, which should not be mutated.
+    host : str
+        Scheme and host of the Base API (defaults to ``https://database.deta.sh``)
+    http : HTTPClient | None
+        Client to send requests through, shared by the bases and drives of a :class:`Deta` instance
     """
-    def __init__(self, name: str, project_id: str, session: ClientSession):
+    def __init__(
+        self,
+        name: str,
+        project_id: str,
+        session: Optional['ClientSession'],
+        *,
+        cache: Optional[Cache] = None,
+        query_cache: Optional[QueryCache] = None,
+        coalesce: bool = False,
+        host: str = BASE_HOST,
+        http: Optional[HTTPClient] = None
+    ):
+        if session is None and http is None:
+            raise ValueError('either session or http is required')
         self.name = name
-        self.session = session
+        self._http = http or HTTPClient(session)
         self.project_id = project_id
-        self.root = f'https://database.deta.sh/v1/{self.project_id}/{name}'
+        self.cache = cache
+        self.query_cache = query_cache
+        self.coalesce = coalesce
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._refreshing: Dict[Hashable, asyncio.Future] = {}
+        self._writers = set()
+        self.root = f'{host.rstrip("/")}/v1/{self.project_id}/{name}'
 
     def __str__(self):
         return self.name
 
+    @property
+    def session(self) -> 'ClientSession':
+        """
+        Client session used for requests
+        """
+        return self._http.session
+
+    async def _single_flight(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.coalesce:
+            return await factory()
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+
+            def _on_done(t: asyncio.Future):
+                if self._inflight.get(key) is t:
+                    del self._inflight[key]
+                if not t.cancelled():
+                    t.exception()
+
+            task.add_done_callback(_on_done)
+        # shielded so that a cancelled caller does not cancel the request for everyone else
+        return await asyncio.shield(task)
+
+    async def _request(self, operation: str, method: str, path: str, **kwargs: Any) -> 'ClientResponse':
+        return await self._http.request(
+            method, self.root + path, operation=f'base.{operation}', target=self.name, **kwargs
+        )
+
+    def _invalidate(self, *keys: Optional[str]):
+        # reads already in flight may have been answered before the write, later readers start their own
+        for flight in [flight for flight in self._inflight if flight[0] == 'fetch']:
+            del self._inflight[flight]
+        for key in keys:
+            if key:
+                self._inflight.pop(('get', key), None)
+        if self.query_cache is not None:
+            self.query_cache.invalidate()
+        if self.cache is None:
+            return
+        for key in keys:
+            if key:
+                self.cache.invalidate(key)
+
     async def close(self):
         """
-        Close the client session
+        Flush open writers and coalescers and close the client session
+        """
+        self._cancel_refreshes()
+        await self._close_writers()
+        await self._http.close()
+
+    def _cancel_refreshes(self):
+        for task in list(self._refreshing.values()):
+            task.cancel()
+
+    async def _close_writers(self):
+        await asyncio.gather(*(writer.close() for writer in list(self._writers)))
+
+    def writer(self, *, max_batch: int = 25, max_delay_ms: float = 50, max_pending: int = 1000) -> BufferedWriter:
+        """
+        Creates a write-behind buffer for this base
+
+        Parameters
+        ----------
+        max_batch : int
+            Maximum number of records per request (defaults to 25)
+        max_delay_ms : float
+            Maximum time in milliseconds a record waits before being flushed (defaults to 50)
+        max_pending : int
+            Maximum number of queued records before :meth:`BufferedWriter.put` starts waiting (defaults to 1000)
+
+        Returns
+        -------
+        BufferedWriter
+            Writer which is flushed when the base or its :class:`Deta` is closed
         """
-        return await self.session.close()
+        writer = BufferedWriter(self, max_batch=max_batch, max_delay_ms=max_delay_ms, max_pending=max_pending)
+        self._writers.add(writer)
+        return writer
+
+    def coalescer(self, *, max_delay_ms: float = 10) -> UpdateCoalescer:
+        """
+        Creates a coalescer which merges updates to the same key of this base
+
+        Parameters
+        ----------
+        max_delay_ms : float
+            Time in milliseconds to wait for more updates to the same key (defaults to 10)
+
+        Returns
+        -------
+        UpdateCoalescer
+            Coalescer which is flushed when the base or its :class:`Deta` is closed
+        """
+        coalescer = UpdateCoalescer(self, max_delay_ms=max_delay_ms)
+        self._writers.add(coalescer)
+        return coalescer
     
     async def put(self, *records: Record):
         """
@@ -56,10 +199,69 @@ class Base:
         """
         if not records:
             raise ValueError('at least one record must be provided')
-        if len(records) > 25:
-            raise ValueError('cannot put more than 25 records at a time')
-        resp = await self.session.put(f'{self.root}/items', json={"items": [record.payload for record in records]})
-        return await _raise_or_return(resp, 207)
+        if len(records) > MAX_PUT_BATCH:
+            raise ValueError(f'cannot put more than {MAX_PUT_BATCH} records at a time')
+        try:
+            payload = {"items": [record.payload for record in records]}
+            resp = await self._request('put', 'PUT', '/items', json=payload)
+            result = await _raise_or_return(resp, 207, self._http.loads)
+        finally:
+            self._invalidate(*(record.key for record in records))
+        self._invalidate(*(item.get('key') for item in (result.get('processed') or {}).get('items') or []))
+        return result
+
+    async def put_many(
+        self,
+        records: Union[Iterable[Record], AsyncIterable[Record]],
+        *,
+        concurrency: int = 4
+    ) -> Dict[str, Any]:
+        """
+        Put any number of records into the base
+
+        Records are split into batches of 25 and sent concurrently,
+        with at most ``concurrency`` requests in flight at once. The records of a batch which was
+        rejected or hit a connection error are listed as failed along with the error, and the other
+        batches carry on. Any other error, like an invalid project key, stops all batches.
+
+        Parameters
+        ----------
+        records : Iterable[Record] | AsyncIterable[Record]
+            Records to be put into the base
+        concurrency : int
+            Maximum number of batches to be sent at the same time (defaults to 4)
+
+        Returns
+        -------
+        Dict[str, Any]
+            Merged response of all batches, in the same shape as :meth:`put`:
+            ``{"processed": {"items": [...]}, "failed": {"items": [...], "errors": [...]}}``.
+            Every failed batch adds ``{"error": exception, "items": [...]}`` to ``errors``.
+
+        Raises
+        ------
+        ValueError
+            If concurrency is less than 1
+        Unauthorized
+            If the project key is invalid
+        """
+        from aiohttp import ClientError
+
+        processed, failed, errors = [], [], []
+
+        async def _put(batch: List[Record]):
+            try:
+                result = await self.put(*batch)
+            except (BadRequest, PayloadTooLarge, DetaUnknownError, ClientError, asyncio.TimeoutError) as e:
+                items = [record.payload for record in batch]
+                failed.extend(items)
+                errors.append({"error": e, "items": items})
+                return
+            processed.extend((result.get('processed') or {}).get('items') or [])
+            failed.extend((result.get('failed') or {}).get('items') or [])
+
+        await _gather_bounded(_put, _batched(records, MAX_PUT_BATCH), concurrency)
+        return {"processed": {"items": processed}, "failed": {"items": failed, "errors": errors}}
 
     async def delete(self, key: str) -> Dict[str, Any]:
         """
@@ -81,8 +283,92 @@ class Base:
 
         ``{"key": "key"}``
         """
-        resp = await self.session.delete(f'{self.root}/items/{key}')
-        return await resp.json()
+        try:
+            resp = await self._request('delete', 'DELETE', f'/items/{key}')
+            return await self._http.json(resp)
+        finally:
+            self._invalidate(key)
+
+    async def delete_many(
+        self,
+        keys: Union[Iterable[str], AsyncIterable[str]],
+        *,
+        concurrency: int = 8,
+        on_progress: Optional[Callable[[int], Any]] = None
+    ) -> int:
+        """
+        Delete many records from the base
+
+        Parameters
+        ----------
+        keys : Iterable[str] | AsyncIterable[str]
+            Keys of the records to be deleted, consumed lazily
+        concurrency : int
+            Maximum number of deletions to be sent at the same time (defaults to 8)
+        on_progress : Callable[[int], Any] | None
+            Called with the number of records deleted so far after each deletion
+
+        Returns
+        -------
+        int
+            Number of deletions sent
+
+        Raises
+        ------
+        ValueError
+            If any key is empty or concurrency is less than 1
+        """
+        deleted = 0
+
+        async def _delete(key: str):
+            nonlocal deleted
+            if not key:
+                raise ValueError('key cannot be empty')
+            await self.delete(key)
+            deleted += 1
+            if on_progress is not None:
+                on_progress(deleted)
+
+        await _gather_bounded(_delete, keys, concurrency)
+        return deleted
+
+    async def delete_where(
+        self,
+        queries: Optional[Union[List[Query], PreparedQuery]] = None,
+        *,
+        concurrency: int = 8,
+        on_progress: Optional[Callable[[int], Any]] = None
+    ) -> int:
+        """
+        Delete all records matching the queries
+
+        Keys are deleted as soon as their page arrives, while later pages are still being fetched.
+
+        Parameters
+        ----------
+        queries : List[Query] | PreparedQuery | None
+            List of Query objects to select the records to be deleted.
+            If not provided, every record in the base is deleted.
+        concurrency : int
+            Maximum number of deletions to be sent at the same time (defaults to 8)
+        on_progress : Callable[[int], Any] | None
+            Called with the number of records deleted so far after each deletion
+
+        Returns
+        -------
+        int
+            Number of deletions sent
+
+        Raises
+        ------
+        BadRequest
+            If request body is invalid
+        """
+        async def _keys():
+            async for record in self.iterate(queries):
+                yield record['key']
+
+        return await self.delete_many(_keys(), concurrency=concurrency, on_progress=on_progress)
 
     async def get(self, key: str) -> Dict[str, Any]:
         """
@@ -104,12 +390,107 @@ class Base:
             If key is empty or None
         NotFound
             If the key does not exist in the base
+
+        Notes
+        -----
+        If the base has a :class:`Cache`, records and missing keys are served from it while fresh.
         """
         if not key:
             raise ValueError('key cannot be empty')
-        resp = await self.session.get(f'{self.root}/items/{key}')
-        return await _raise_or_return(resp, 200)
-    
+        if self.cache is not None:
+            cached = self.cache._get(key)
+            if cached is _NOT_FOUND:
+                raise NotFound("Resource not found")
+            if cached is not _MISSING:
+                return cached
+        generation = self.cache.generation if self.cache is not None else None
+
+        async def _get():
+            resp = await self._request('get', 'GET', f'/items/{key}')
+            return await _raise_or_return(resp, 200, self._http.loads)
+
+        try:
+            record = await self._single_flight(('get', key), _get)
+        except NotFound:
+            if self.cache is not None:
+                self.cache.set_missing(key, generation=generation)
+            raise
+        if self.cache is not None:
+            self.cache.set(key, record, expires_at=record.get('__expires'), generation=generation)
+        return record
+
+    async def get_many(
+        self,
+        keys: Iterable[str],
+        *,
+        chunk_size: int = 100,
+        concurrency: int = 4
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Get many records from the base by key
+
+        Keys are looked up in chunks of OR'ed key queries which are fetched concurrently.
+
+        Parameters
+        ----------
+        keys : Iterable[str]
+            Keys of the records to be fetched
+        chunk_size : int
+            Maximum number of keys looked up by a single query (defaults to 100)
+        concurrency : int
+            Maximum number of chunks to be fetched at the same time (defaults to 4)
+
+        Returns
+        -------
+        Dict[str, Dict[str, Any] | None]
+            Mapping of every requested key to its record, or to None if the key does not exist
+
+        Raises
+        ------
+        ValueError
+            If any key is empty or chunk_size is less than 1
+        BadRequest
+            If request body is invalid
+        """
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be at least 1')
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        for key in keys:
+            if not key:
+                raise ValueError('key cannot be empty')
+            results[key] = None
+        remaining = list(results)
+        generation = None
+        if self.cache is not None:
+            generation = self.cache.generation
+            remaining = []
+            for key in results:
+                cached = self.cache._get(key)
+                if cached is _MISSING:
+                    remaining.append(key)
+                elif cached is not _NOT_FOUND:
+                    results[key] = cached
+
+        async def _lookup(chunk: List[str]):
+            queries = []
+            for key in chunk:
+                query = Query()
+                query.equals('key', key)
+                queries.append(query)
+            async for record in self.iterate(queries):
+                results[record['key']] = record
+
+        chunks = [remaining[i:i + chunk_size] for i in range(0, len(remaining), chunk_size)]
+        await _gather_bounded(_lookup, chunks, concurrency)
+        if self.cache is not None:
+            for key in remaining:
+                record = results[key]
+                if record is None:
+                    self.cache.set_missing(key, generation=generation)
+                else:
+                    self.cache.set(key, record, expires_at=record.get('__expires'), generation=generation)
+        return results
+
     async def update(self, key: str, updater: Updater) -> Dict[str, Any]:
         """
         Update a record in the base
@@ -137,8 +518,13 @@ class Base:
         """
         if not key:
             raise ValueError('key cannot be empty')
-        resp = await self.session.patch(f'{self.root}/items/{key}', json=updater.json())
-        return await _raise_or_return(resp, 200)
+        try:
+            resp = await self._request(
+                'update', 'PATCH', f'/items/{key}', json=updater.json(), idempotent=updater._idempotent()
+            )
+            return await _raise_or_return(resp, 200, self._http.loads)
+        finally:
+            self._invalidate(key)
 
     async def insert(self, record: Record) -> Dict[str, Any]:
         """
@@ -161,23 +547,30 @@ class Base:
         KeyConflict
             If the key already exists in the base
         """
-        resp = await self.session.post(f'{self.root}/items', json={"item": record.payload})
-        return await _raise_or_return(resp, 201)
+        try:
+            payload = {"item": record.payload}
+            resp = await self._request('insert', 'POST', '/items', json=payload, idempotent=False)
+            return await _raise_or_return(resp, 201, self._http.loads)
+        finally:
+            self._invalidate(record.key)
 
     async def fetch(
         self,
-        queries: Optional[List[Query]] = None,
+        queries: Optional[Union[List[Query], PreparedQuery]] = None,
         *,
         limit: Optional[int] = None,
         last: Optional[str] = None,
-        sort: bool = False
+        sort: bool = False,
+        columnar: bool = False,
+        fields: Optional[Sequence[str]] = None,
+        typed: bool = False
     ) -> Dict[str, Any]:
         """
         Fetch records from the base
 
         Parameters
         ----------
-        queries : List[Query] | None
+        queries : List[Query] | PreparedQuery | None
             List of Query objects to be applied to the fetch operation
         limit : int | None
             Maximum number of records to be fetched (defaults to 1000)
@@ -185,6 +578,12 @@ class Base:
             Key of the last record fetched in the previous fetch operation
         sort : bool
             Whether to sort the results by key in descending order (defaults to False)
+        columnar : bool
+            Whether to return the items as a mapping of field names to columns of values (defaults to False)
+        fields : Sequence[str] | None
+            Fields to keep in columnar mode, all of them if not provided
+        typed : bool
+            Whether numeric columns are returned as :class:`array.array` in columnar mode (defaults to False)
 
         Returns
         -------
@@ -196,17 +595,103 @@ class Base:
         BadRequest
             If request body is invalid
         """
-        if queries is None:
-            queries = []
-        payload = {"query": [q.json() for q in queries]}
+        if columnar:
+            result = await self.fetch(queries, limit=limit, last=last, sort=sort)
+            columns = _Columns(fields, typed=typed)
+            columns.extend(result.get('items') or [])
+            return {**result, 'items': columns.columns}
+        request = self._query_request(queries, limit, last, sort)
+        if self.query_cache is not None:
+            if isinstance(queries, PreparedQuery):
+                key = (queries.key, last)
+            else:
+                key = (PreparedQuery._identity(queries or [], limit, sort, self._http.encode), last)
+            return await self._fetch_cached(key, request)
+
+        async def _fetch():
+            resp = await self._request('fetch', 'POST', '/query', **request)
+            return await _raise_or_return(resp, 200, self._http.loads)
+
+        if not self.coalesce:
+            return await _fetch()
+        if isinstance(queries, PreparedQuery):
+            return await self._single_flight(('fetch', queries.key, last), _fetch)
+        return await self._single_flight(('fetch', _stable_dumps(request['json'], self._http.encode)), _fetch)
+
+    async def _fetch_cached(self, key: Hashable, request: Dict[str, Any]) -> Dict[str, Any]:
+        result, state = self.query_cache._get(key)
+        if state == _FRESH:
+            return result
+        if state == _STALE:
+            if key not in self._refreshing:
+                task = asyncio.ensure_future(self._fetch_into_cache(key, request))
+                self._refreshing[key] = task
+
+                def _on_done(t: asyncio.Future):
+                    self._refreshing.pop(key, None)
+                    # a failed refresh leaves the stale result in place until it expires
+                    if not t.cancelled():
+                        t.exception()
+
+                task.add_done_callback(_on_done)
+            return result
+        return await self._single_flight(('fetch', key), lambda: self._fetch_into_cache(key, request))
+
+    async def _fetch_into_cache(self, key: Hashable, request: Dict[str, Any]) -> Dict[str, Any]:
+        generation = self.query_cache.generation
+        resp = await self._request('fetch', 'POST', '/query', **request)
+        result = await _raise_or_return(resp, 200, self._http.loads)
+        self.query_cache._put(key, result, len(await resp.read()), generation)
+        return result
+
+    def prepare(
+        self,
+        queries: Optional[List[Query]] = None,
+        *,
+        limit: Optional[int] = None,
+        sort: bool = False
+    ) -> PreparedQuery:
+        """
+        Normalise and encode queries once, for fetches repeated many times
+
+        The returned query can be passed to :meth:`fetch`, :meth:`fetch_all` and :meth:`iterate`
+        in place of a list of queries, only the cursor is added to its request body then.
+
+        Parameters
+        ----------
+        queries : List[Query] | None
+            List of Query objects to be applied to the fetch operation
+        limit : int | None
+            Maximum number of records per fetch (defaults to 1000)
+        sort : bool
+            Whether to sort the results by key in descending order (defaults to False)
+
+        Returns
+        -------
+        PreparedQuery
+            The prepared query, encoded with the JSON encoder of this base
+        """
+        return PreparedQuery(queries, limit=limit, sort=sort, encode=self._http.encode)
+
+    @staticmethod
+    def _query_request(
+        queries: Optional[Union[List[Query], PreparedQuery]],
+        limit: Optional[int],
+        last: Optional[str],
+        sort: bool
+    ) -> Dict[str, Any]:
+        if isinstance(queries, PreparedQuery):
+            if limit or sort:
+                raise ValueError('limit and sort are part of the prepared query')
+            return {'data': queries.body(last), 'headers': {'Content-Type': 'application/json'}}
+        payload = {"query": [q.json() for q in queries or []]}
         if limit:
             payload['limit'] = limit
         if last:
             payload['last'] = last
         if sort:
             payload['sort'] = 'desc'
-        resp = await self.session.post(f'{self.root}/query', json=payload)
-        return await _raise_or_return(resp, 200)
+        return {'json': payload}
 
     @staticmethod
     def _process_result(result: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
@@ -216,31 +701,409 @@ class Base:
         except KeyError:
             return items, None
 
-    async def fetch_all(self, queries: Optional[List[Query]] = None) -> List[Dict[str, Any]]:
+    async def iterate(
+        self,
+        queries: Optional[Union[List[Query], PreparedQuery]] = None,
+        *,
+        page_size: Optional[int] = None,
+        sort: bool = False,
+        pages: bool = False,
+        incremental: bool = False,
+        offload: bool = False
+    ) -> AsyncIterator[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Iterate over all records matching the queries, page by page
+
+        The next page is requested as soon as the current one arrives,
+        so it is fetched while the caller is still processing the current page.
+
+        Parameters
+        ----------
+        queries : List[Query] | PreparedQuery | None
+            List of Query objects to be applied to the fetch operation
+        page_size : int | None
+            Maximum number of records per page (defaults to 1000)
+        sort : bool
+            Whether to sort the results by key in descending order (defaults to False)
+        pages : bool
+            Whether to yield whole pages instead of single records (defaults to False)
+        incremental : bool
+            Whether to decode records one by one while a page is being read, instead of
+            reading and decoding the whole page at once (defaults to False).
+            Pages are not shared with concurrent identical fetches in this mode.
+        offload : bool
+            Whether to decode pages in a worker thread in incremental mode (defaults to False)
+
+        Yields
+        ------
+        Dict[str, Any] | List[Dict[str, Any]]
+            Records fetched from the base, or pages of records if ``pages`` is True
+
+        Raises
+        ------
+        BadRequest
+            If request body is invalid
+        """
+        if incremental:
+            async for item in self._iterate_incremental(queries, page_size, sort, pages, offload):
+                yield item
+            return
+        pending = asyncio.ensure_future(self.fetch(queries, limit=page_size, sort=sort))
+        try:
+            while pending:
+                items, last = self._process_result(await pending)
+                pending = None
+                if last:
+                    pending = asyncio.ensure_future(self.fetch(queries, limit=page_size, last=last, sort=sort))
+                if pages:
+                    yield items
+                else:
+                    for item in items:
+                        yield item
+        finally:
+            if pending:
+                pending.cancel()
+
+    async def _iterate_incremental(
+        self,
+        queries: Optional[Union[List[Query], PreparedQuery]],
+        page_size: Optional[int],
+        sort: bool,
+        pages: bool,
+        offload: bool
+    ) -> AsyncIterator[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        def _send(last: Optional[str]) -> Awaitable['ClientResponse']:
+            request = self._query_request(queries, page_size, last, sort)
+            return asyncio.ensure_future(self._request('fetch', 'POST', '/query', **request))
+
+        pending = _send(None)
+        try:
+            while pending:
+                resp = await pending
+                pending = None
+                if resp.status != 200:
+                    raise await _raise_or_return(resp, 200, self._http.loads)
+                stream = self._http.stream_items(resp, offload=offload)
+                page = []
+                try:
+                    async for item in stream:
+                        # the paging field comes before the items, so the next page can be requested early
+                        last = (stream.fields.get('paging') or {}).get('last')
+                        if pending is None and last:
+                            pending = _send(last)
+                        if pages:
+                            page.append(item)
+                        else:
+                            yield item
+                finally:
+                    resp.release()
+                last = (stream.fields.get('paging') or {}).get('last')
+                if pending is None and last:
+                    pending = _send(last)
+                if pages:
+                    yield page
+        finally:
+            if pending:
+                pending.cancel()
+                if pending.done() and not pending.cancelled() and pending.exception() is None:
+                    pending.result().release()
+
+    @staticmethod
+    def _partition(query: Query, partition: Union[str, Tuple[str, str]]) -> Query:
+        if any(field == 'key' or field.startswith('key?') for field in query.json()):
+            raise ValueError('cannot partition a query which already filters by key')
+        query = query.copy()
+        if isinstance(partition, str):
+            query.prefix('key', partition)
+        else:
+            start, end = partition
+            query.range('key', start, end)
+        return query
+
+    async def fetch_all(
+        self,
+        queries: Optional[Union[List[Query], PreparedQuery]] = None,
+        *,
+        parallel: bool = False,
+        partitions: Optional[Sequence[Union[str, Tuple[str, str]]]] = None,
+        columnar: bool = False,
+        fields: Optional[Sequence[str]] = None,
+        typed: bool = False
+    ) -> Union[List[Dict[str, Any]], Dict[str, Union[List[Any], array.array]]]:
         """
         Fetch all records from the base
 
         Parameters
         ----------
-        queries : List[Query] | None
+        queries : List[Query] | PreparedQuery | None
             List of Query objects to be applied to the fetch operation
+        parallel : bool
+            Whether to page through each query as a separate concurrent stream (defaults to False).
+            Records matched by more than one query are returned only once.
+        partitions : Sequence[str | Tuple[str, str]] | None
+            Key prefixes (``key?pfx``) or inclusive key ranges (``key?r``) to split every query into.
+            Each query and partition pair is fetched as its own concurrent stream, implying ``parallel``.
+        columnar : bool
+            Whether to return a mapping of field names to columns of values instead of a list of records,
+            built page by page as they arrive (defaults to False). Missing values are None.
+        fields : Sequence[str] | None
+            Fields to keep in columnar mode, all of them if not provided
+        typed : bool
+            Whether numeric columns are returned as :class:`array.array` in columnar mode (defaults to False)
 
         Returns
         -------
-        List[Dict[str, Any]]
-            List of records fetched from the base
+        List[Dict[str, Any]] | Dict[str, List[Any] | array.array]
+            List of records fetched from the base, or their columns in columnar mode
 
         Raises
         ------
+        ValueError
+            If partitions are given for a query which already filters by key
         BadRequest
             If request body is invalid
         """
+        columns = _Columns(fields, typed=typed) if columnar else None
+        if parallel or partitions:
+            if isinstance(queries, PreparedQuery):
+                raise ValueError('prepared queries cannot be fetched in parallel')
+            streams = queries or [Query()]
+            if partitions:
+                streams = [self._partition(query, partition) for query in streams for partition in partitions]
+            results = {}
+
+            async def _drain(query: Query):
+                async for items in self.iterate([query], pages=True):
+                    if columns is None:
+                        for item in items:
+                            results.setdefault(item['key'], item)
+                        continue
+                    fresh = [item for item in items if item['key'] not in results]
+                    results.update(dict.fromkeys(item['key'] for item in fresh))
+                    columns.extend(fresh)
+
+            await _gather_bounded(_drain, streams, len(streams))
+            return columns.columns if columns is not None else list(results.values())
+
         results = []
+        extend = columns.extend if columns is not None else results.extend
         result = await self.fetch(queries)
         items, last = self._process_result(result)
-        results.extend(items)
+        extend(items)
         while last:
             result = await self.fetch(queries, last=last)
             items, last = self._process_result(result)
-            results.extend(items)
-        return results
+            extend(items)
+        return columns.columns if columns is not None else results
+
+    async def export(
+        self,
+        target: Union[str, os.PathLike, BinaryIO],
+        *,
+        queries: Optional[Union[List[Query], PreparedQuery]] = None,
+        compress: Optional[bool] = None,
+        checkpoint: Optional[Union[str, os.PathLike]] = None,
+        page_size: Optional[int] = None
+    ) -> int:
+        """
+        Export records of the base as newline delimited JSON, page by page
+
+        Every page is appended as its own gzip member when compressing, so the file stays readable
+        by :mod:`gzip` and can be cut back to the last checkpoint. With a ``checkpoint`` file the cursor
+        of the last written page is saved after each page, and an interrupted export to a path resumes
+        from it when called again. The checkpoint file is removed once the export completes.
+
+        Parameters
+        ----------
+        target : str | os.PathLike | BinaryIO
+            Path of the file to write to, or a binary stream
+        queries : List[Query] | PreparedQuery | None
+            List of Query objects selecting the records to export
+        compress : bool | None
+            Whether to compress with gzip (defaults to True for paths ending with ``.gz``)
+        checkpoint : str | os.PathLike | None
+            Path of the file to save the progress in
+        page_size : int | None
+            Maximum number of records per page (defaults to 1000)
+
+        Returns
+        -------
+        int
+            Total number of records exported, including those of a resumed export
+
+        Raises
+        ------
+        BadRequest
+            If request body is invalid
+        """
+        import gzip
+
+        loop = asyncio.get_event_loop()
+        state = _read_checkpoint(checkpoint) if checkpoint else None
+        state = state or {'last': None, 'records': 0, 'offset': 0}
+        path = None if hasattr(target, 'write') else os.fspath(target)
+        if compress is None:
+            compress = path is not None and path.endswith('.gz')
+        if path is None:
+            stream = target
+        elif state['last']:
+            stream = open(path, 'r+b')
+            stream.truncate(state['offset'])
+            stream.seek(state['offset'])
+        else:
+            stream = open(path, 'wb')
+
+        def _write(data: bytes, progress: Dict[str, Any]):
+            stream.write(data)
+            stream.flush()
+            if checkpoint and progress['last']:
+                if path is not None:
+                    os.fsync(stream.fileno())
+                _write_checkpoint(checkpoint, progress)
+
+        encode = self._http.encode
+        pending = asyncio.ensure_future(self.fetch(queries, limit=page_size, last=state['last']))
+        try:
+            while pending:
+                items, last = self._process_result(await pending)
+                pending = None
+                if last:
+                    pending = asyncio.ensure_future(self.fetch(queries, limit=page_size, last=last))
+                data = b''.join([encode(item) + b'\n' for item in items])
+                if compress:
+                    data = gzip.compress(data)
+                state = {'last': last, 'records': state['records'] + len(items), 'offset': state['offset'] + len(data)}
+                await loop.run_in_executor(None, _write, data, state)
+        finally:
+            if pending:
+                pending.cancel()
+            if path is not None:
+                stream.close()
+        if checkpoint:
+            _remove_checkpoint(checkpoint)
+        return state['records']
+
+    async def import_(
+        self,
+        source: Union[str, os.PathLike, BinaryIO],
+        *,
+        compress: Optional[bool] = None,
+        checkpoint: Optional[Union[str, os.PathLike]] = None,
+        concurrency: int = 4
+    ) -> int:
+        """
+        Import records from newline delimited JSON, as written by :meth:`export`
+
+        Lines are read as they are needed and put in batches of 25, with at most ``concurrency``
+        batches in flight. With a ``checkpoint`` file the number of lines put so far is saved about
+        once a second, and an interrupted import resumes from it when called again.
+        The checkpoint file is removed once the import completes.
+
+        Parameters
+        ----------
+        source : str | os.PathLike | BinaryIO
+            Path of the file to read from, or a binary stream
+        compress : bool | None
+            Whether the source is compressed with gzip (detected from the content of paths by default)
+        checkpoint : str | os.PathLike | None
+            Path of the file to save the progress in
+        concurrency : int
+            Maximum number of batches to be sent at the same time (defaults to 4)
+
+        Returns
+        -------
+        int
+            Number of records put by this call
+
+        Raises
+        ------
+        ValueError
+            If concurrency is less than 1
+        BadRequest
+            If request body of any batch is invalid
+        DetaUnknownError
+            If the records of a batch could not be put
+        """
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1')
+        import gzip
+
+        loop = asyncio.get_event_loop()
+        state = _read_checkpoint(checkpoint) if checkpoint else None
+        done_lines = state['lines'] if state else 0
+        if hasattr(source, 'read'):
+            stream = gzip.GzipFile(fileobj=source) if compress else source
+            opened = None
+        else:
+            opened = open(source, 'rb')
+            if compress is None:
+                compress = opened.read(2) == b'\x1f\x8b'
+                opened.seek(0)
+            stream = gzip.GzipFile(fileobj=opened) if compress else opened
+        lines = iter(stream)
+        loads = self._http.loads
+
+        def _read() -> Tuple[List[Dict[str, Any]], int]:
+            raw = list(islice(lines, MAX_PUT_BATCH))
+            return [loads(line) for line in raw if line.strip()], len(raw)
+
+        async def _put(rows: List[Dict[str, Any]]) -> int:
+            result = await self.put(*Record.bulk(rows)) if rows else {}
+            failed = (result.get('failed') or {}).get('items')
+            if failed:
+                raise DetaUnknownError(f'failed to put {len(failed)} records')
+            return len(rows)
+
+        # batches may finish out of order, the checkpoint only covers lines of which all batches were put
+        in_flight: Dict[asyncio.Task, int] = {}
+        ends: Dict[int, int] = {}
+        put: Set[int] = set()
+        submitted = confirmed = imported = 0
+        position = done_lines
+        saved_at = time.monotonic()
+        try:
+            await loop.run_in_executor(None, lambda: sum(1 for _ in islice(lines, done_lines)))
+            exhausted = False
+            while in_flight or not exhausted:
+                while not exhausted and len(in_flight) < concurrency:
+                    rows, count = await loop.run_in_executor(None, _read)
+                    if not count:
+                        exhausted = True
+                        break
+                    position += count
+                    ends[submitted] = position
+                    in_flight[asyncio.ensure_future(_put(rows))] = submitted
+                    submitted += 1
+                if not in_flight:
+                    break
+                completed, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                error = None
+                for task in completed:
+                    index = in_flight.pop(task)
+                    if task.exception() is None:
+                        imported += task.result()
+                        put.add(index)
+                    elif error is None:
+                        error = task.exception()
+                while confirmed in put:
+                    put.remove(confirmed)
+                    done_lines = ends.pop(confirmed)
+                    confirmed += 1
+                if error is not None:
+                    raise error
+                if checkpoint and time.monotonic() - saved_at >= 1:
+                    await loop.run_in_executor(None, _write_checkpoint, checkpoint, {'lines': done_lines})
+                    saved_at = time.monotonic()
+        except BaseException:
+            for task in in_flight:
+                task.cancel()
+            if checkpoint:
+                _write_checkpoint(checkpoint, {'lines': done_lines})
+            raise
+        finally:
+            if opened is not None:
+                stream.close()
+                opened.close()
+        if checkpoint:
+            _remove_checkpoint(checkpoint)
+        return imported
@@ -0,0 +1,274 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+
+from .errors import DetaUnknownError
+from .utils import Record, Updater
+
+if TYPE_CHECKING:
+    from .base import Base
+
+__all__ = ['BufferedWriter', 'UpdateCoalescer']
+
+_CLOSE = object()
+
+
+class BufferedWriter:
+    """
+    Write-behind buffer which collects records and puts them into a base in batches
+
+    A batch is flushed once it holds ``max_batch`` records or ``max_delay_ms`` after its first record arrived.
+    Writers are created with :meth:`Base.writer` and are flushed when the base or its :class:`Deta` is closed.
+
+    Parameters
+    ----------
+    base : Base
+        Base to put the records into
+    max_batch : int
+        Maximum number of records per request (defaults to 25)
+    max_delay_ms : float
+        Maximum time in milliseconds a record waits before being flushed (defaults to 50)
+    max_pending : int
+        Maximum number of queued records before :meth:`put` starts waiting (defaults to 1000)
+    """
+    def __init__(self, base: 'Base', *, max_batch: int = 25, max_delay_ms: float = 50, max_pending: int = 1000):
+        if not 1 <= max_batch <= 25:
+            raise ValueError('max_batch must be between 1 and 25')
+        if max_pending < 1:
+            raise ValueError('max_pending must be at least 1')
+        self.base = base
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.max_pending = max_pending
+        self.closed = False
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Future] = set()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    async def put(self, record: Record) -> 'asyncio.Future[Dict[str, Any]]':
+        """
+        Queue a record to be put into the base
+
+        Waits while the queue is full.
+
+        Parameters
+        ----------
+        record : Record
+            Record to be put into the base
+
+        Returns
+        -------
+        asyncio.Future[Dict[str, Any]]
+            Future resolving to the processed item once the record is committed
+
+        Raises
+        ------
+        RuntimeError
+            If the writer is closed
+        """
+        if self.closed:
+            raise RuntimeError('writer is closed')
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_pending)
+            self._worker = asyncio.ensure_future(self._run())
+        future = asyncio.get_event_loop().create_future()
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        await self._queue.put((record, future))
+        return future
+
+    async def flush(self):
+        """
+        Wait until every record queued so far is committed or failed
+        """
+        if self._pending:
+            await asyncio.wait(list(self._pending))
+
+    async def close(self):
+        """
+        Flush all queued records and stop the writer
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.base._writers.discard(self)
+        if self._worker is not None:
+            await self._queue.put((_CLOSE, None))
+            await self._worker
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        stop = False
+        while not stop:
+            first = await self._queue.get()
+            if first[0] is _CLOSE:
+                break
+            batch = [first]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                if item[0] is _CLOSE:
+                    stop = True
+                    break
+                batch.append(item)
+            await self._commit(batch)
+
+    async def _commit(self, batch: List[Tuple[Record, asyncio.Future]]):
+        try:
+            result = await self.base.put(*(record for record, _ in batch))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        processed = (result.get('processed') or {}).get('items') or []
+        failed = (result.get('failed') or {}).get('items') or []
+        if not failed and len(processed) == len(batch):
+            for (_, future), item in zip(batch, processed):
+                if not future.done():
+                    future.set_result(item)
+            return
+        # keyless records cannot be told apart once some of the batch failed
+        processed_by_key = {item.get('key'): item for item in processed}
+        for record, future in batch:
+            if future.done():
+                continue
+            if record.key in processed_by_key:
+                future.set_result(processed_by_key[record.key])
+            else:
+                future.set_exception(DetaUnknownError(f'record `{record.key}` was not processed'))
+
+
+class UpdateCoalescer:
+    """
+    Merges updates to the same key which arrive within a short window into a single request
+
+    Updates are merged with :meth:`Updater.merge`. An update which cannot be merged with the pending one
+    starts a new batch, and batches of the same key are always sent in order.
+    Coalescers are created with :meth:`Base.coalescer` and are flushed when the base or its :class:`Deta` is closed.
+
+    Parameters
+    ----------
+    base : Base
+        Base to update the records of
+    max_delay_ms : float
+        Time in milliseconds to wait for more updates to the same key (defaults to 10)
+    """
+    def __init__(self, base: 'Base', *, max_delay_ms: float = 10):
+        self.base = base
+        self.max_delay = max_delay_ms / 1000
+        self.closed = False
+        self._pending: Dict[str, list] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    async def update(self, key: str, updater: Updater) -> Dict[str, Any]:
+        """
+        Update a record in the base, merged with other updates to the same key
+
+        Parameters
+        ----------
+        key : str
+            Key of the record to be updated
+        updater : Updater
+            Object containing the update operations
+
+        Returns
+        -------
+        Dict[str, Any]
+            Response from the API for the merged update
+
+        Raises
+        ------
+        ValueError
+            If key is empty or None
+        RuntimeError
+            If the coalescer is closed
+        """
+        if not key:
+            raise ValueError('key cannot be empty')
+        if self.closed:
+            raise RuntimeError('coalescer is closed')
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        entry = self._pending.get(key)
+        if entry is not None and entry[0].merge(updater):
+            entry[1].append(future)
+        else:
+            if entry is not None:
+                self._send(key)
+            merged = Updater()
+            merged.merge(updater)
+            handle = loop.call_later(self.max_delay, self._send, key)
+            self._pending[key] = [merged, [future], handle]
+        return await future
+
+    async def flush(self):
+        """
+        Send all pending updates and wait for them to complete
+        """
+        for key in list(self._pending):
+            self._send(key)
+        if self._inflight:
+            await asyncio.wait(list(self._inflight.values()))
+
+    async def close(self):
+        """
+        Flush all pending updates and stop the coalescer
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.base._writers.discard(self)
+        await self.flush()
+
+    def _send(self, key: str):
+        updater, futures, handle = self._pending.pop(key)
+        handle.cancel()
+        task = asyncio.ensure_future(self._commit(key, updater, futures, self._inflight.get(key)))
+        self._inflight[key] = task
+
+        def _on_done(t: asyncio.Task):
+            if self._inflight.get(key) is t:
+                del self._inflight[key]
+
+        task.add_done_callback(_on_done)
+
+    async def _commit(
+        self,
+        key: str,
+        updater: Updater,
+        futures: List[asyncio.Future],
+        previous: Optional[asyncio.Task]
+    ):
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            result = await self.base.update(key, updater)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for future in futures:
+                if not future.done():
+                    future.set_result(result)
@@ -0,0 +1,246 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+__all__ = ['Cache', 'QueryCache']
+
+_MISSING = object()
+_NOT_FOUND = object()
+_FRESH, _STALE = 'fresh', 'stale'
+
+
+class Cache:
+    """
+    Bounded in-memory LRU cache for records read through a :class:`Base`
+
+    Entries expire after ``ttl`` seconds or at the record's ``__expires`` time, whichever comes first.
+    Cached records are shared with the caller, so they should not be mutated.
+    A cache must not be shared by more than one base, as entries are keyed only by record key.
+
+    Every invalidation bumps :attr:`generation` and records it for the invalidated key. Reads pass the
+    generation seen before their request to :meth:`set` and :meth:`set_missing`, which skip the entry
+    if its key was invalidated since, so a record read before a write is not cached after it.
+    Writes to other keys do not affect it.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of entries kept in the cache (defaults to 1024)
+    ttl : float
+        Time in seconds after which an entry expires (defaults to 60)
+    negative_ttl : float | None
+        Time in seconds for which a missing key is remembered (defaults to ``ttl``).
+        Set to 0 to disable caching of missing keys.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, *, negative_ttl: Optional[float] = None):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+        # generation of the last invalidation of recently invalidated keys, bounded by maxsize
+        self._invalidated: 'OrderedDict[Hashable, int]' = OrderedDict()
+        # reads older than this can't be checked against their key anymore
+        self._horizon = 0
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            deadline, value = entry
+            if deadline > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return _MISSING
+
+    def _changed(self, key: Hashable, generation: int) -> bool:
+        return generation < self._horizon or self._invalidated.get(key, generation) > generation
+
+    def _put(self, key: Hashable, value: Any, ttl: float, generation: Optional[int]):
+        if ttl <= 0 or (generation is not None and self._changed(key, generation)):
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        *,
+        expires_at: Optional[float] = None,
+        generation: Optional[int] = None
+    ):
+        """
+        Add or replace an entry
+
+        Parameters
+        ----------
+        key : Hashable
+            Key of the entry
+        value : Any
+            Value to be cached
+        expires_at : float | None
+            Unix time after which the entry must not be served
+        generation : int | None
+            Generation seen before the value was read, the entry is not added if the key was invalidated since
+        """
+        ttl = self.ttl
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+        self._put(key, value, ttl, generation)
+
+    def set_missing(self, key: Hashable, *, generation: Optional[int] = None):
+        """
+        Remember that a key does not exist
+
+        Parameters
+        ----------
+        key : Hashable
+            Key which was not found
+        generation : int | None
+            Generation seen before the key was looked up, the entry is not added if it was invalidated since
+        """
+        self._put(key, _NOT_FOUND, self.negative_ttl, generation)
+
+    def invalidate(self, key: Hashable):
+        """
+        Remove an entry if present
+
+        Parameters
+        ----------
+        key : Hashable
+            Key of the entry
+        """
+        self.generation += 1
+        self._entries.pop(key, None)
+        self._invalidated[key] = self.generation
+        self._invalidated.move_to_end(key)
+        if len(self._invalidated) > self.maxsize:
+            _, self._horizon = self._invalidated.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all entries
+        """
+        self.generation += 1
+        self._entries.clear()
+        self._invalidated.clear()
+        self._horizon = self.generation
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns hit, miss and eviction counters along with the current size
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+        }
+
+
+class QueryCache:
+    """
+    Byte-bounded LRU cache for fetch results of a :class:`Base`
+
+    Results are keyed by their normalised queries, limit, sort and cursor and are fresh for ``ttl`` seconds.
+    For ``stale_ttl`` seconds after that a stale result is still served right away while it is refetched
+    in the background. Any write through the base drops all entries, as it may change any result.
+    Cached results are shared with the caller, so they should not be mutated.
+    A cache must not be shared by more than one base.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Maximum total size of the cached response bodies (defaults to 16 MiB)
+    ttl : float
+        Time in seconds for which a result is fresh (defaults to 5)
+    stale_ttl : float
+        Time in seconds after expiry during which a stale result is served while it is refreshed (defaults to 0)
+    """
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, ttl: float = 5.0, *, stale_ttl: float = 0.0):
+        if max_bytes < 1:
+            raise ValueError('max_bytes must be at least 1')
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.nbytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # bumped by every invalidation, so that results fetched before a write are not stored after it
+        self.generation = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[float, int, Any]]' = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get(self, key: Hashable) -> Tuple[Any, Optional[str]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, _, value = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value, _FRESH
+            if age < self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                return value, _STALE
+            self._discard(key)
+        self.misses += 1
+        return _MISSING, None
+
+    def _put(self, key: Hashable, value: Any, size: int, generation: int):
+        if generation != self.generation or size > self.max_bytes or self.ttl + self.stale_ttl <= 0:
+            return
+        self._discard(key)
+        self._entries[key] = (time.monotonic(), size, value)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, (_, evicted, _) = self._entries.popitem(last=False)
+            self.nbytes -= evicted
+            self.evictions += 1
+
+    def _discard(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+
+    def invalidate(self):
+        """
+        Remove all entries and ignore results of fetches still in flight
+        """
+        self.generation += 1
+        self._entries.clear()
+        self.nbytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns hit, stale hit, miss and eviction counters along with the current size
+        """
+        return {
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'nbytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+        }
@@ -1,16 +1,27 @@
 import asyncio
 import os
+import weakref
 
-import aiohttp
-from .base import Base
-from .drive import Drive
-from typing import Optional
+from .base import Base, BASE_HOST
+from .cache import Cache, QueryCache
+from .drive import Drive, DRIVE_HOST
+from .http import HTTPClient, PoolConfig
+from .limiter import AdaptiveLimiter
+from .metrics import RequestHook, _trace_config
+from .retry import RetryPolicy
+from typing import Optional, Any, Callable, Union, Sequence, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import aiohttp
 
 
 class Deta:
     """
     Base class for Deta
 
+    Client sessions are created on the first request, so creating an instance is cheap
+    and does not need a running event loop.
+
     Parameters
     ----------
     project_key : str
@@ -19,51 +30,162 @@ class Deta:
         External client session to be used for requests
     loop : asyncio.AbstractEventLoop | None
         Event loop to be used for requests
+    base_host : str
+        Scheme and host of the Base API (defaults to ``https://database.deta.sh``)
+    drive_host : str
+        Scheme and host of the Drive API (defaults to ``https://drive.deta.sh``)
+    retry : RetryPolicy | None
+        Policy for retrying requests which failed with a transient error, no retries if not provided
+    pool : PoolConfig | None
+        Connection pool and timeout settings of the client session
+    connector : aiohttp.BaseConnector | None
+        Connector to be shared with other :class:`Deta` instances, it is not closed along with this instance
+    drive_pool : PoolConfig | None
+        Settings of a separate connection pool for drives, so that large transfers can't starve bases
+    drive_connector : aiohttp.BaseConnector | None
+        Shared connector for a separate connection pool for drives
+    dumps : Callable[[Any], str | bytes] | None
+        Function encoding request bodies to JSON, like ``orjson.dumps`` (defaults to :func:`json.dumps`)
+    loads : Callable[[bytes], Any] | None
+        Function decoding JSON responses and errors, like ``orjson.loads`` (defaults to :func:`json.loads`)
+    hooks : Sequence[Callable[[RequestEvent], Any]]
+        Functions called with a :class:`RequestEvent` after every request, like a :class:`MetricsCollector`.
+        More can be added to :attr:`hooks` later. Pool wait times are only measured on sessions created
+        by this instance, with hooks given before the first request.
+    limiter : AdaptiveLimiter | None
+        Limiter adapting the number of in-flight requests of all bases and drives, no limit if not provided
     """
 
     def __init__(
         self,
         project_key: str,
         *,
-        session: Optional[aiohttp.ClientSession] = None,
-        loop: Optional[asyncio.AbstractEventLoop] = None
+        session: Optional['aiohttp.ClientSession'] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        base_host: str = BASE_HOST,
+        drive_host: str = DRIVE_HOST,
+        retry: Optional[RetryPolicy] = None,
+        pool: Optional[PoolConfig] = None,
+        connector: Optional['aiohttp.BaseConnector'] = None,
+        drive_pool: Optional[PoolConfig] = None,
+        drive_connector: Optional['aiohttp.BaseConnector'] = None,
+        dumps: Optional[Callable[[Any], Union[str, bytes]]] = None,
+        loads: Optional[Callable[[bytes], Any]] = None,
+        hooks: Sequence[RequestHook] = (),
+        limiter: Optional[AdaptiveLimiter] = None
     ):
         if not project_key:
             raise ValueError('project key is required')
         self.token = project_key
         assert self.token, 'project key is required'
         assert len(self.token.split('_')) == 2, 'invalid project key'
-        if not session:
-            self.session = aiohttp.ClientSession(loop=loop)
-        else:
-            self.session = session
-        self.session.headers.update({'X-API-Key': self.token, 'Content-Type': 'application/json'})
+        if session and (pool or connector or drive_pool or drive_connector):
+            raise ValueError('pool settings cannot be used with an external session')
+        self._headers = {'X-API-Key': self.token, 'Content-Type': 'application/json'}
+        self._session = session
+        if session:
+            session.headers.update(self._headers)
+        self._drive_session: Optional['aiohttp.ClientSession'] = None
+        self._loop = loop
+        self._pool, self._connector = pool, connector
+        self._drive_pool, self._drive_connector = drive_pool, drive_connector
         self.project_id = self.token.split('_')[0]
+        self.base_host = base_host
+        self.drive_host = drive_host
+        self.retry = retry
+        self.hooks = list(hooks)
+        self.limiter = limiter
+        options = dict(retry=retry, dumps=dumps, loads=loads, hooks=self.hooks, limiter=limiter)
+        self._base_http = HTTPClient(lambda: self.session, **options)
+        self._drive_http = HTTPClient(lambda: self.drive_session, **options)
+        self._bases = weakref.WeakSet()
+
+    @property
+    def session(self) -> 'aiohttp.ClientSession':
+        """
+        Client session of the bases, and of the drives unless they have their own pool
+        """
+        if self._session is None:
+            self._session = self._create_session(self._pool, self._connector, self._loop, bool(self.hooks))
+            self._session.headers.update(self._headers)
+        return self._session
+
+    @property
+    def drive_session(self) -> 'aiohttp.ClientSession':
+        """
+        Client session of the drives
+        """
+        if not (self._drive_pool or self._drive_connector):
+            return self.session
+        if self._drive_session is None:
+            self._drive_session = self._create_session(
+                self._drive_pool, self._drive_connector, self._loop, bool(self.hooks)
+            )
+            self._drive_session.headers.update(self._headers)
+        return self._drive_session
+
+    @staticmethod
+    def _create_session(
+        pool: Optional[PoolConfig],
+        connector: Optional['aiohttp.BaseConnector'],
+        loop: Optional[asyncio.AbstractEventLoop],
+        traced: bool
+    ) -> 'aiohttp.ClientSession':
+        import aiohttp
+
+        trace_configs = [_trace_config()] if traced else None
+        if not pool and not connector:
+            return aiohttp.ClientSession(loop=loop, trace_configs=trace_configs)
+        pool = pool or PoolConfig()
+        return aiohttp.ClientSession(
+            connector=connector or pool.connector(),
+            connector_owner=connector is None,
+            timeout=pool.timeout(),
+            trace_configs=trace_configs,
+            loop=loop
+        )
 
     @classmethod
     def from_env(
         cls,
-        session: Optional[aiohttp.ClientSession] = None,
-        loop: Optional[asyncio.AbstractEventLoop] = None
+        session: Optional['aiohttp.ClientSession'] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        **options: Any
     ) -> 'Deta':
 
-        return cls(os.environ.get("DETA_PROJECT_KEY"), session=session, loop=loop)
+        return cls(os.environ.get("DETA_PROJECT_KEY"), session=session, loop=loop, **options)
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, _, exc, __):
-        await self.session.close()
+        await self.close()
         if exc:
             raise exc
 
     async def close(self):
         """
-        Close the client session
+        Flush open writers and coalescers of every base and close the client session
         """
-        await self.session.close()
-
-    def base(self, name: str) -> Base:
+        try:
+            bases = list(self._bases)
+            for base in bases:
+                base._cancel_refreshes()
+            await asyncio.gather(*(base._close_writers() for base in bases))
+        finally:
+            if self._session is not None:
+                await self._session.close()
+            if self._drive_session is not None:
+                await self._drive_session.close()
+
+    def base(
+        self,
+        name: str,
+        *,
+        cache: Optional[Cache] = None,
+        query_cache: Optional[QueryCache] = None,
+        coalesce: bool = False
+    ) -> Base:
         """
         Creates a lazy instance of Base
 
@@ -71,13 +193,30 @@ class Deta:
         ----------
         name : str
             Name of the base
+        cache : Cache | None
+            Cache to serve reads of the base from
+        query_cache : QueryCache | None
+            Cache to serve fetches of the base from
+        coalesce : bool
+            Whether concurrent identical reads share one in-flight request
 
         Returns
         -------
         Base
             Instance of Base
         """
-        return Base(name, self.project_id, self.session)
+        base = Base(
+            name,
+            self.project_id,
+            None,
+            cache=cache,
+            query_cache=query_cache,
+            coalesce=coalesce,
+            host=self.base_host,
+            http=self._base_http
+        )
+        self._bases.add(base)
+        return base
 
     def drive(self, name: str) -> Drive:
         """
@@ -93,4 +232,4 @@ class Deta:
         Drive
             Instance of Drive
         """
-        return Drive(name, self.project_id, self.session)
+        return Drive(name, self.project_id, None, host=self.drive_host, http=self._drive_http)
@@ -1,11 +1,15 @@
 import re
 import asyncio
-from aiohttp import ClientSession, StreamReader
 from urllib.parse import quote_plus
-from typing import Dict, Optional, Any, Tuple
+from typing import Dict, Optional, Any, Tuple, TYPE_CHECKING
 
 from .errors import *
+from .http import HTTPClient
 
+if TYPE_CHECKING:
+    from aiohttp import ClientSession, ClientResponse, StreamReader
+
+DRIVE_HOST = 'https://drive.deta.sh'
 MAX_UPLOAD_SIZE = 10485760  # 10MB
 
 
@@ -19,21 +23,47 @@ class Drive:
         Name of the drive
     project_key : str
         Project key of the drive
-    session : aiohttp.ClientSession
-        External client session to be used for requests
+    session : aiohttp.ClientSession | None
+        External client session to be used for requests, the one of ``http`` is used if not provided
+    host : str
+        Scheme and host of the Drive API (defaults to ``https://drive.deta.sh``)
+    http : HTTPClient | None
+        Client to send requests through, shared by the bases and drives of a :class:`Deta` instance
     """
 
-    def __init__(self, name: str, project_key: str, session: ClientSession):
+    def __init__(
+        self,
+        name: str,
+        project_key: str,
+        session: Optional['ClientSession'],
+        *,
+        host: str = DRIVE_HOST,
+        http: Optional[HTTPClient] = None
+    ):
+        if session is None and http is None:
+            raise ValueError('either session or http is required')
         self.name = name
-        self.session = session
+        self._http = http or HTTPClient(session)
         self.project_id = project_key.split('_')[0]
-        self.root = f'https://drive.deta.sh/v1/{self.project_id}/{quote_plus(name)}'
+        self.root = f'{host.rstrip("/")}/v1/{self.project_id}/{quote_plus(name)}'
+
+    @property
+    def session(self) -> 'ClientSession':
+        """
+        Client session used for requests
+        """
+        return self._http.session
 
     async def close(self):
         """
         Close the client session
         """
-        await self.session.close()
+        await self._http.close()
+
+    async def _request(self, operation: str, method: str, path: str, **kwargs: Any) -> 'ClientResponse':
+        return await self._http.request(
+            method, self.root + path, operation=f'drive.{operation}', target=self.name, **kwargs
+        )
 
     async def put(
         self, 
@@ -79,28 +109,33 @@ class Drive:
             save_as = quote_plus(save_as)
         headers = {"Content-Type": content_type}
         if not len(content) > MAX_UPLOAD_SIZE:
-            resp = await self.session.post(f'{self.root}/files?name={save_as}', headers=headers, data=content)
-            return await _raise_or_return(resp, 201)
+            resp = await self._request('put', 'POST', f'/files?name={save_as}', headers=headers, data=content)
+            return await _raise_or_return(resp, 201, self._http.loads)
 
-        r = await self.session.post(f'{self.root}/uploads?name={save_as}', headers=headers)
+        r = await self._request(
+            'upload.start', 'POST', f'/uploads?name={save_as}', headers=headers, idempotent=False
+        )
         if r.status == 202:
-            data = await r.json()
+            data = await self._http.json(r)
             upload_id, name = data['upload_id'], data['name']
             chunks = [content[i:i+MAX_UPLOAD_SIZE] for i in range(0, len(content), MAX_UPLOAD_SIZE)]
+            # every part is retried on its own under the retry policy of the client
+            path = f"/uploads/{upload_id}/parts?name={name}"
             tasks = [
-                self.session.post(f"{self.root}/uploads/{upload_id}/parts?name={name}&part={i + 1}", data=chunk)
+                self._request('upload.part', 'POST', f'{path}&part={i + 1}', data=chunk)
                 for i, chunk in enumerate(chunks)
             ]
             gathered = await asyncio.gather(*tasks)
             status_codes = [r.status == 200 for r in gathered]
             if all(status_codes):
-                resp = await self.session.patch(f"{self.root}/uploads/{upload_id}?name={name}")
-                return await _raise_or_return(resp, 200)
+                resp = await self._request('upload.finish', 'PATCH', f"/uploads/{upload_id}?name={name}")
+                return await _raise_or_return(resp, 200, self._http.loads)
             else:
-                await self.session.delete(f"{self.root}/uploads/{upload_id}?name={name}", headers=headers)
+                path = f"/uploads/{upload_id}?name={name}"
+                await self._request('upload.abort', 'DELETE', path, headers=headers)
                 raise IncompleteUpload(f"Failed to upload all chunks of the file `{name}`")
         else:
-            raise await _raise_or_return(r, 202)
+            raise await _raise_or_return(r, 202, self._http.loads)
 
     async def files(
         self, 
@@ -128,8 +163,8 @@ class Drive:
             Response from the API
         """
         if not limit and not prefix and not last:
-            init_r = await self.session.get(f'{self.root}/files')
-            init_d = await init_r.json()
+            init_r = await self._request('files', 'GET', '/files')
+            init_d = await self._http.json(init_r)
             last = None
             files = init_d['names']
             try:
@@ -137,8 +172,8 @@ class Drive:
             except KeyError:
                 pass
             while last:
-                resp = await self.session.get(f'{self.root}/files?last={last}')
-                data = await resp.json()
+                resp = await self._request('files', 'GET', f'/files?last={last}')
+                data = await self._http.json(resp)
                 files.extend(data['names'])
                 try:
                     last = data['paging']['last']
@@ -148,13 +183,13 @@ class Drive:
 
         if not limit or limit > 1000 or limit < 0:
             limit = 1000
-        url = f'{self.root}/files?limit={limit}'
+        path = f'/files?limit={limit}'
         if prefix:
-            url += f'&prefix={prefix}'
+            path += f'&prefix={prefix}'
         if last:
-            url += f'&last={last}'
-        resp = await self.session.get(url)
-        return await resp.json()
+            path += f'&last={last}'
+        resp = await self._request('files', 'GET', path)
+        return await self._http.json(resp)
 
     async def delete(self, *names: str) -> Dict[str, Any]:
         """
@@ -172,8 +207,8 @@ class Drive:
         """
         if not names:
             raise ValueError('at least one filename must be provided')
-        r = await self.session.delete(f'{self.root}/files', json={'names': list(names)})
-        return await r.json()
+        r = await self._request('delete', 'DELETE', '/files', json={'names': list(names)})
+        return await self._http.json(r)
     
     async def size_of(self, name: str) -> int:
         """
@@ -184,7 +219,7 @@ class Drive:
         name : str
             Name of the file to get the size of
         """
-        resp = await self.session.get(f'{self.root}/files?name={name}', headers={'Range': 'bytes=0-0'})
+        resp = await self._request('size_of', 'GET', f'/files?name={name}', headers={'Range': 'bytes=0-0'})
         if resp.status != 206:
             raise NotFound(f'File `{name}` not found')
         range_header_value = resp.headers.get('Content-Range')
@@ -192,7 +227,7 @@ class Drive:
         match = pattern.match(range_header_value)
         return int(match.group(1))
 
-    async def get(self, name: str, *, _range: Optional[Tuple[int, int]] = None) -> StreamReader:
+    async def get(self, name: str, *, _range: Optional[Tuple[int, int]] = None) -> 'StreamReader':
         """
         Get a file from the drive
 
@@ -219,8 +254,8 @@ class Drive:
         if _range:
             start, end = _range if len(_range) == 2 else (_range[0], None)
             headers['Range'] = f'bytes={start}-{end}' if end else f'bytes={start}-'
-        resp = await self.session.get(f'{self.root}/files/download?name={name}', headers=headers)
+        resp = await self._request('get', 'GET', f'/files/download?name={name}', headers=headers)
         if resp.status in (200, 206):
             return resp.content
         else:
-            raise await _raise_or_return(resp)
+            raise await _raise_or_return(resp, 200, self._http.loads)
@@ -1,5 +1,8 @@
-from aiohttp import ClientResponse
-from typing import Any, Dict
+import json
+from typing import Any, Callable, Dict, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from aiohttp import ClientResponse
 
 
 __all__ = [
@@ -91,16 +94,20 @@ class DetaUnknownError(Exception):
         return self.message
 
 
-async def _raise_or_return(response: ClientResponse, ok: int = 200) -> Dict[str, Any]:
+async def _raise_or_return(
+    response: 'ClientResponse',
+    ok: int = 200,
+    loads: Callable[[bytes], Any] = json.loads
+) -> Dict[str, Any]:
     if response.status == ok:
-        return await response.json()
+        return loads(await response.read())
     if response.status == 401:
         raise Unauthorized("Invalid API key")
     if response.status == 413:
         raise PayloadTooLarge("Payload size exceeds the limit of 10MB")
     if response.status == 404:
         raise NotFound("Resource not found")
-    errors = await response.json()
+    errors = loads(await response.read())
     message = ". ".join(errors['errors'])
     if response.status == 400:
         raise BadRequest(message)
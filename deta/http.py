@@ -0,0 +1,414 @@
+import asyncio
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union, Sequence, TYPE_CHECKING
+
+from .limiter import AdaptiveLimiter
+from .metrics import RequestEvent, RequestHook
+from .retry import RetryPolicy
+
+if TYPE_CHECKING:
+    from aiohttp import ClientSession, ClientResponse, ClientTimeout, TCPConnector
+
+__all__ = ['HTTPClient', 'PoolConfig']
+
+
+def _compact_dumps(obj: Any) -> str:
+    return json.dumps(obj, separators=(',', ':'))
+
+
+class PoolConfig:
+    """
+    Connection pool and timeout settings of a client session
+
+    Parameters
+    ----------
+    limit : int
+        Maximum number of open connections, 0 for no limit (defaults to 100)
+    limit_per_host : int
+        Maximum number of open connections to the same host, 0 for no limit (defaults to 0)
+    keepalive_timeout : float
+        Time in seconds an idle connection is kept open for reuse (defaults to 15)
+    ttl_dns_cache : int | None
+        Time in seconds resolved addresses are cached for, None to cache forever (defaults to 10)
+    connect_timeout : float | None
+        Maximum time in seconds to wait for a connection, including waiting for a free one in the pool
+    read_timeout : float | None
+        Maximum time in seconds to wait between two reads of a response
+    total_timeout : float | None
+        Maximum time in seconds for a whole request, None for no limit (defaults to 300, like aiohttp)
+    """
+    def __init__(
+        self,
+        *,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 15.0,
+        ttl_dns_cache: Optional[int] = 10,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        total_timeout: Optional[float] = 300.0
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+
+    def connector(self) -> 'TCPConnector':
+        """
+        Creates a connector with these pool settings, which can be shared by many :class:`Deta` instances
+        """
+        from aiohttp import TCPConnector
+
+        return TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.ttl_dns_cache,
+        )
+
+    def timeout(self) -> 'ClientTimeout':
+        """
+        Creates the client timeout of these settings
+        """
+        from aiohttp import ClientTimeout
+
+        return ClientTimeout(total=self.total_timeout, connect=self.connect_timeout, sock_read=self.read_timeout)
+
+
+_STRUCTURAL = re.compile(rb'[\[\]{}",:]')
+_STRING_END = re.compile(rb'["\\]')
+
+
+class _ItemScanner:
+    # splits a JSON object fed in chunks into the raw elements of one of its array fields,
+    # the other fields are collected whole. Only structural characters are visited.
+    def __init__(self, field: bytes):
+        self.field = field
+        self.fields: Dict[bytes, bytearray] = {}
+        self._buffer = bytearray()
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._key_start: Optional[int] = None
+        self._key: Optional[bytes] = None
+        self._start: Optional[int] = None
+        self._in_items = False
+
+    def feed(self, data: bytes) -> List[bytes]:
+        buffer = self._buffer
+        buffer += data
+        items = []
+        pos, depth = self._pos, self._depth
+        while True:
+            if self._in_string:
+                match = _STRING_END.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                if match.group() == b'\\':
+                    if match.end() == len(buffer):
+                        # the escaped character is in the next chunk
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                pos = match.end()
+                self._in_string = False
+                if self._key_start is not None:
+                    self._key = bytes(buffer[self._key_start:pos - 1])
+                    self._key_start = None
+                continue
+            match = _STRUCTURAL.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                break
+            char, index, pos = match.group(), match.start(), match.end()
+            if char == b'"':
+                self._in_string = True
+                if depth == 1 and self._start is None and not self._in_items:
+                    self._key_start = pos
+            elif char in b'[{':
+                depth += 1
+                if depth == 2 and char == b'[' and self._key == self.field:
+                    self._in_items = True
+                    self._start = pos
+            elif char in b']}':
+                depth -= 1
+                if depth == 1 and self._in_items:
+                    self._emit(items, index)
+                    self._in_items = False
+                    self._start = None
+                elif depth == 0:
+                    self._close_field(index)
+            elif char == b':':
+                if depth == 1 and not self._in_items and self._key != self.field:
+                    self._start = pos
+            elif depth == 2 and self._in_items:
+                self._emit(items, index)
+                self._start = pos
+            elif depth == 1:
+                self._close_field(index)
+        self._depth = depth
+        # drop what was scanned and is not part of a pending value
+        cut = min(mark for mark in (pos, self._start, self._key_start) if mark is not None)
+        if cut:
+            del buffer[:cut]
+            pos -= cut
+            if self._start is not None:
+                self._start -= cut
+            if self._key_start is not None:
+                self._key_start -= cut
+        self._pos = pos
+        return items
+
+    def _emit(self, items: List[bytes], end: int):
+        raw = bytes(self._buffer[self._start:end])
+        if raw.strip():
+            items.append(raw)
+
+    def _close_field(self, end: int):
+        if self._start is not None and self._key is not None:
+            self.fields[self._key] = self._buffer[self._start:end]
+        self._start = None
+        self._key = None
+
+
+class _ItemStream:
+    # decodes the elements of an array field of a JSON response while it is being read
+    def __init__(
+        self,
+        response: 'ClientResponse',
+        loads: Callable[[bytes], Any],
+        *,
+        field: str = 'items',
+        offload: bool = False,
+        chunk_size: int = 65536
+    ):
+        self.response = response
+        self.loads = loads
+        self.offload = offload
+        self.chunk_size = chunk_size
+        self.fields: Dict[str, Any] = {}
+        self._scanner = _ItemScanner(field.encode('utf-8'))
+
+    def _parse(self, chunk: bytes) -> List[Any]:
+        items = [self.loads(raw) for raw in self._scanner.feed(chunk)]
+        for key in list(self._scanner.fields):
+            self.fields[key.decode('utf-8')] = self.loads(bytes(self._scanner.fields.pop(key)))
+        return items
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        loop = asyncio.get_event_loop()
+        content = self.response.content
+        while True:
+            chunk = await content.read(self.chunk_size)
+            if not chunk:
+                break
+            if self.offload:
+                items = await loop.run_in_executor(None, self._parse, chunk)
+            else:
+                items = self._parse(chunk)
+            for item in items:
+                yield item
+
+
+class HTTPClient:
+    """
+    Sends the requests of :class:`Base` and :class:`Drive` instances
+
+    Parameters
+    ----------
+    session : aiohttp.ClientSession | Callable[[], aiohttp.ClientSession]
+        Client session to be used for requests, or a function creating it on the first request
+    retry : RetryPolicy | None
+        Policy for retrying requests which failed with a transient error
+    dumps : Callable[[Any], str | bytes] | None
+        Function encoding request bodies to JSON (defaults to :func:`json.dumps`)
+    loads : Callable[[bytes], Any] | None
+        Function decoding JSON response bodies (defaults to :func:`json.loads`)
+    hooks : Sequence[Callable[[RequestEvent], Any]]
+        Functions called with a :class:`RequestEvent` after every request, a list is used as is,
+        so that hooks added to it later are called as well. Exceptions raised by a hook are passed to the
+        exception handler of the event loop.
+    limiter : AdaptiveLimiter | None
+        Limiter every attempt of a request has to take a slot from
+    """
+    def __init__(
+        self,
+        session: Union['ClientSession', Callable[[], 'ClientSession']],
+        *,
+        retry: Optional[RetryPolicy] = None,
+        dumps: Optional[Callable[[Any], Union[str, bytes]]] = None,
+        loads: Optional[Callable[[bytes], Any]] = None,
+        hooks: Sequence[RequestHook] = (),
+        limiter: Optional[AdaptiveLimiter] = None
+    ):
+        if callable(session):
+            self._session, self._create_session = None, session
+        else:
+            self._session, self._create_session = session, None
+        self.retry = retry
+        self.dumps = dumps or _compact_dumps
+        self.loads = loads or json.loads
+        self.hooks = hooks if isinstance(hooks, list) else list(hooks)
+        self.limiter = limiter
+
+    @property
+    def session(self) -> 'ClientSession':
+        """
+        Client session used for requests, created on first use if a function was given
+        """
+        if self._session is None:
+            self._session = self._create_session()
+        return self._session
+
+    async def close(self):
+        """
+        Close the client session, unless it was never created
+        """
+        if self._session is not None:
+            await self._session.close()
+
+    def encode(self, obj: Any) -> bytes:
+        """
+        Encode an object to a JSON request body
+
+        Parameters
+        ----------
+        obj : Any
+            Object to be encoded
+        """
+        body = self.dumps(obj)
+        return body.encode('utf-8') if isinstance(body, str) else body
+
+    async def json(self, response: 'ClientResponse') -> Any:
+        """
+        Read and decode a JSON response body
+
+        Parameters
+        ----------
+        response : aiohttp.ClientResponse
+            Response to be read
+        """
+        return self.loads(await response.read())
+
+    def stream_items(self, response: 'ClientResponse', *, field: str = 'items', offload: bool = False) -> _ItemStream:
+        """
+        Decode the elements of an array field of a JSON response one by one while it is being read
+
+        The other fields of the response are available in the ``fields`` dictionary of the returned
+        stream as soon as they were read.
+
+        Parameters
+        ----------
+        response : aiohttp.ClientResponse
+            Response to be read
+        field : str
+            Top-level field holding the array (defaults to ``items``)
+        offload : bool
+            Whether to decode in a worker thread instead of the event loop (defaults to False)
+        """
+        return _ItemStream(response, self.loads, field=field, offload=offload)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        operation: str = 'request',
+        target: Optional[str] = None,
+        idempotent: bool = True,
+        **kwargs: Any
+    ) -> 'ClientResponse':
+        """
+        Send a request, retrying it if a retry policy is set
+
+        Parameters
+        ----------
+        method : str
+            HTTP method of the request
+        url : str
+            URL of the request
+        operation : str
+            Name of the operation reported to hooks and the limiter, like ``base.put``
+        target : str | None
+            Name of the base or drive reported to hooks
+        idempotent : bool
+            Whether the request can be safely repeated (defaults to True)
+        **kwargs : Any
+            Other arguments passed on to :meth:`aiohttp.ClientSession.request`.
+            A ``json`` body is encoded with ``dumps``, pre-encoded bytes can be passed as ``data``.
+        """
+        if 'json' in kwargs:
+            kwargs['data'] = self.encode(kwargs.pop('json'))
+            kwargs['headers'] = {'Content-Type': 'application/json', **(kwargs.get('headers') or {})}
+        if not self.hooks:
+            return await self._send(method, url, operation, idempotent, kwargs)
+
+        event = RequestEvent(operation, target, method, url)
+        data = kwargs.get('data')
+        if isinstance(data, (bytes, bytearray)):
+            event.request_bytes = len(data)
+        kwargs['trace_request_ctx'] = event
+        started = time.perf_counter()
+        try:
+            response = await self._send(method, url, operation, idempotent, kwargs, event)
+        except BaseException as e:
+            event.error = e
+            raise
+        else:
+            event.status = response.status
+            event.response_bytes = response.content_length
+            return response
+        finally:
+            event.latency = time.perf_counter() - started
+            for hook in self.hooks:
+                # a failing hook must not fail the request or leak its response
+                try:
+                    hook(event)
+                except Exception as e:
+                    asyncio.get_event_loop().call_exception_handler({
+                        'message': f'request hook {hook!r} failed',
+                        'exception': e,
+                        'event': event,
+                    })
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        operation: str,
+        idempotent: bool,
+        kwargs: Dict[str, Any],
+        event: Optional[RequestEvent] = None
+    ) -> 'ClientResponse':
+        async def send():
+            if event is not None:
+                event.attempts += 1
+            if self.limiter is None:
+                return await self.session.request(method, url, **kwargs)
+            from aiohttp import ClientConnectionError
+
+            await self.limiter.acquire(operation)
+            started = time.perf_counter()
+            latency, ok = None, True
+            try:
+                response = await self.session.request(method, url, **kwargs)
+            except (ClientConnectionError, asyncio.TimeoutError):
+                ok = False
+                raise
+            else:
+                latency = time.perf_counter() - started
+                ok = response.status != 429 and response.status < 500
+                return response
+            finally:
+                self.limiter.release(operation, latency, ok=ok)
+
+        if self.retry is None:
+            return await send()
+        return await self.retry.run(send, idempotent=idempotent)
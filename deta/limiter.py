@@ -0,0 +1,148 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, Optional, Tuple
+
+__all__ = ['AdaptiveLimiter']
+
+
+class AdaptiveLimiter:
+    """
+    Client-wide limit on in-flight requests which adapts to observed latency and errors
+
+    The limit grows by one for every window of requests answered in time (additive increase)
+    and is multiplied by ``backoff`` when a request is throttled, fails with a server error or
+    takes longer than ``tolerance`` times the lowest latency seen for its operation (multiplicative decrease).
+    A slot is held from sending a request until its response headers arrive, retries take a new slot.
+
+    Waiting requests with a higher priority are let through first.
+
+    Parameters
+    ----------
+    initial : int
+        Starting limit (defaults to 16)
+    min_limit : int
+        Lowest limit (defaults to 1)
+    max_limit : int
+        Highest limit (defaults to 256)
+    backoff : float
+        Factor the limit is multiplied by on congestion (defaults to 0.5)
+    tolerance : float
+        Latency over the lowest seen latency of an operation which counts as congestion (defaults to 2.0)
+    latency_target : float | None
+        Fixed latency in seconds which counts as congestion, instead of ``tolerance``
+    priorities : Dict[str, int] | None
+        Priority of operations by name, like ``{'base.get': 10, 'drive.get': -10}`` (defaults to 0)
+    """
+    def __init__(
+        self,
+        initial: int = 16,
+        *,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        backoff: float = 0.5,
+        tolerance: float = 2.0,
+        latency_target: Optional[float] = None,
+        priorities: Optional[Dict[str, int]] = None
+    ):
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError('limits must satisfy 1 <= min_limit <= initial <= max_limit')
+        if not 0 < backoff < 1:
+            raise ValueError('backoff must be between 0 and 1')
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.latency_target = latency_target
+        self.priorities = dict(priorities or {})
+        self.in_flight = 0
+        self._baselines: Dict[str, float] = {}
+        self._last_decrease = 0.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    @property
+    def concurrency(self) -> int:
+        """
+        Current number of requests allowed in flight
+        """
+        return max(self.min_limit, int(self.limit))
+
+    @property
+    def waiting(self) -> int:
+        """
+        Number of requests waiting for a slot
+        """
+        return sum(1 for *_, future in self._waiters if not future.done())
+
+    async def acquire(self, operation: Optional[str] = None, *, priority: Optional[int] = None):
+        """
+        Wait for a free slot
+
+        Parameters
+        ----------
+        operation : str | None
+            Name of the operation, used to look up its priority
+        priority : int | None
+            Priority overriding the one of the operation
+        """
+        if priority is None:
+            priority = self.priorities.get(operation, 0)
+        if self.in_flight < self.concurrency and not self._waiters:
+            self.in_flight += 1
+            return
+        future = asyncio.get_event_loop().create_future()
+        heapq.heappush(self._waiters, (-priority, next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was handed over right before the cancellation, pass it on
+                self.in_flight -= 1
+                self._wake()
+            raise
+
+    def release(self, operation: Optional[str] = None, latency: Optional[float] = None, *, ok: bool = True):
+        """
+        Free a slot and adapt the limit to the outcome of the request
+
+        Parameters
+        ----------
+        operation : str | None
+            Name of the operation
+        latency : float | None
+            Time in seconds until the response headers arrived, None to leave the limit as is after a success
+        ok : bool
+            False if the request was throttled or failed with a server or connection error
+        """
+        self.in_flight -= 1
+        self._adapt(operation, latency, ok)
+        self._wake()
+
+    def _adapt(self, operation: Optional[str], latency: Optional[float], ok: bool):
+        if ok and latency is None:
+            return
+        congested = not ok
+        if ok:
+            # the baseline creeps up slowly, so that it follows lasting changes of the network
+            baseline = min(latency, self._baselines.get(operation, latency) * 1.001)
+            self._baselines[operation] = baseline
+            congested = latency > (self.latency_target or baseline * self.tolerance)
+        if congested:
+            now = time.monotonic()
+            # a burst of slow responses from one window of requests only counts once
+            if now - self._last_decrease >= (latency or self._baselines.get(operation, 0.0)):
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                self._last_decrease = now
+        else:
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.concurrency:
+            *_, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
@@ -0,0 +1,235 @@
+import bisect
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from aiohttp import TraceConfig
+
+__all__ = ['RequestEvent', 'MetricsCollector']
+
+RequestHook = Callable[['RequestEvent'], Any]
+
+
+class RequestEvent:
+    """
+    Describes a finished request, passed to the hooks of a :class:`Deta` instance
+
+    Attributes
+    ----------
+    operation : str
+        Name of the operation, like ``base.put`` or ``drive.get``
+    target : str | None
+        Name of the base or drive
+    method : str
+        HTTP method of the request
+    url : str
+        URL of the request
+    status : int | None
+        Status code of the final response, None if the request raised
+    latency : float
+        Time in seconds until the response headers arrived, including retries
+    request_bytes : int | None
+        Size of the request body, None if not known upfront
+    response_bytes : int | None
+        Size of the response body as announced by the server, None if not known
+    pool_wait : float
+        Time in seconds spent waiting for a free connection in the pool
+    attempts : int
+        Number of attempts made, more than one if the request was retried
+    error : BaseException | None
+        Exception raised by the request, if any
+    """
+    __slots__ = (
+        'operation', 'target', 'method', 'url', 'status', 'latency',
+        'request_bytes', 'response_bytes', 'pool_wait', 'attempts', 'error'
+    )
+
+    def __init__(self, operation: str, target: Optional[str], method: str, url: str):
+        self.operation = operation
+        self.target = target
+        self.method = method
+        self.url = url
+        self.status: Optional[int] = None
+        self.latency = 0.0
+        self.request_bytes: Optional[int] = None
+        self.response_bytes: Optional[int] = None
+        self.pool_wait = 0.0
+        self.attempts = 0
+        self.error: Optional[BaseException] = None
+
+    def __repr__(self):
+        return (
+            f'<RequestEvent operation={self.operation!r} target={self.target!r} status={self.status} '
+            f'latency={self.latency:.4f} attempts={self.attempts}>'
+        )
+
+
+def _trace_config() -> 'TraceConfig':
+    # measures the time requests spend queued for a connection, reported through RequestEvent.pool_wait
+    from aiohttp import TraceConfig
+
+    trace = TraceConfig()
+
+    async def on_queued_start(_, context, __):
+        context.queued_at = time.perf_counter()
+
+    async def on_queued_end(_, context, __):
+        event = context.trace_request_ctx
+        if isinstance(event, RequestEvent):
+            event.pool_wait += time.perf_counter() - context.queued_at
+
+    trace.on_connection_queued_start.append(on_queued_start)
+    trace.on_connection_queued_end.append(on_queued_end)
+    return trace
+
+
+class _Series:
+    __slots__ = ('count', 'errors', 'retries', 'statuses', 'buckets', 'latency_sum',
+                 'pool_wait_sum', 'request_bytes', 'response_bytes')
+
+    def __init__(self, size: int):
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.statuses: Dict[str, int] = {}
+        self.buckets = [0] * size
+        self.latency_sum = 0.0
+        self.pool_wait_sum = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+class MetricsCollector:
+    """
+    Hook aggregating requests into per-operation counters and latency histograms
+
+    Pass it to :class:`Deta` as one of its ``hooks`` and read the aggregates with :meth:`snapshot`
+    or :meth:`prometheus`.
+
+    Parameters
+    ----------
+    buckets : Tuple[float, ...]
+        Upper bounds of the latency histogram buckets in seconds
+    """
+    def __init__(
+        self,
+        buckets: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    ):
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, Optional[str]], _Series] = {}
+
+    def __call__(self, event: RequestEvent):
+        key = (event.operation, event.target)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series(len(self.buckets) + 1)
+        series.count += 1
+        series.retries += max(0, event.attempts - 1)
+        status = 'error' if event.status is None else str(event.status)
+        series.statuses[status] = series.statuses.get(status, 0) + 1
+        if event.status is None or event.status >= 400:
+            series.errors += 1
+        series.buckets[bisect.bisect_left(self.buckets, event.latency)] += 1
+        series.latency_sum += event.latency
+        series.pool_wait_sum += event.pool_wait
+        series.request_bytes += event.request_bytes or 0
+        series.response_bytes += event.response_bytes or 0
+
+    def reset(self):
+        """
+        Drop all aggregates
+        """
+        self._series.clear()
+
+    def quantile(self, operation: str, q: float, target: Optional[str] = None) -> Optional[float]:
+        """
+        Estimate a latency quantile of an operation from its histogram
+
+        Parameters
+        ----------
+        operation : str
+            Name of the operation
+        q : float
+            Quantile between 0 and 1
+        target : str | None
+            Name of the base or drive, all of them if not provided
+
+        Returns
+        -------
+        float | None
+            Upper bound in seconds of the bucket holding the quantile, None if there were no requests
+        """
+        counts = [0] * (len(self.buckets) + 1)
+        for (name, series_target), series in self._series.items():
+            if name == operation and (target is None or series_target == target):
+                counts = [a + b for a, b in zip(counts, series.buckets)]
+        total = sum(counts)
+        if not total:
+            return None
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            seen += count
+            if seen >= q * total:
+                return bound
+        return float('inf')
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        Returns the aggregates of every operation and target as plain dictionaries
+        """
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+        return [
+            {
+                'operation': operation,
+                'target': target,
+                'count': series.count,
+                'errors': series.errors,
+                'retries': series.retries,
+                'statuses': dict(series.statuses),
+                'latency_sum': series.latency_sum,
+                'latency_buckets': dict(zip(bounds, series.buckets)),
+                'pool_wait_sum': series.pool_wait_sum,
+                'request_bytes': series.request_bytes,
+                'response_bytes': series.response_bytes,
+            }
+            for (operation, target), series in self._series.items()
+        ]
+
+    def prometheus(self, prefix: str = 'deta') -> str:
+        """
+        Renders the aggregates in the Prometheus text exposition format
+
+        Parameters
+        ----------
+        prefix : str
+            Prefix of the metric names (defaults to ``deta``)
+        """
+        histogram, requests, retries, pool_wait, request_bytes, response_bytes = [], [], [], [], [], []
+        for (operation, target), series in self._series.items():
+            labels = f'operation="{operation}",target="{target or ""}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series.buckets):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                histogram.append(f'{prefix}_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            histogram.append(f'{prefix}_request_duration_seconds_sum{{{labels}}} {series.latency_sum}')
+            histogram.append(f'{prefix}_request_duration_seconds_count{{{labels}}} {series.count}')
+            for status, count in series.statuses.items():
+                requests.append(f'{prefix}_requests_total{{{labels},status="{status}"}} {count}')
+            retries.append(f'{prefix}_request_retries_total{{{labels}}} {series.retries}')
+            pool_wait.append(f'{prefix}_pool_wait_seconds_total{{{labels}}} {series.pool_wait_sum}')
+            request_bytes.append(f'{prefix}_request_bytes_total{{{labels}}} {series.request_bytes}')
+            response_bytes.append(f'{prefix}_response_bytes_total{{{labels}}} {series.response_bytes}')
+        families = [
+            ('request_duration_seconds', 'histogram', histogram),
+            ('requests_total', 'counter', requests),
+            ('request_retries_total', 'counter', retries),
+            ('pool_wait_seconds_total', 'counter', pool_wait),
+            ('request_bytes_total', 'counter', request_bytes),
+            ('response_bytes_total', 'counter', response_bytes),
+        ]
+        lines = []
+        for name, kind, samples in families:
+            lines.append(f'# TYPE {prefix}_{name} {kind}')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
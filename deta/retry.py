@@ -0,0 +1,142 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Iterable, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from aiohttp import ClientResponse
+
+__all__ = ['RetryPolicy']
+
+
+class RetryPolicy:
+    """
+    Policy for retrying requests which failed with a transient error
+
+    Requests are retried on connection errors, timeouts and the given status codes, waiting
+    an exponentially growing, fully jittered delay between attempts or as long as the
+    ``Retry-After`` header of the response asks for. Non-idempotent requests, like :meth:`Base.insert`
+    or updates with increments, are never retried.
+
+    Parameters
+    ----------
+    max_attempts : int
+        Maximum number of attempts per request, including the first one (defaults to 4)
+    base_delay : float
+        Delay in seconds before the first retry, doubled with every attempt (defaults to 0.1)
+    max_delay : float
+        Maximum backoff in seconds between two attempts, a longer ``Retry-After`` is still respected (defaults to 10)
+    deadline : float | None
+        Maximum time in seconds spent on a request including retries, no retry is started past it
+        and an attempt still running at it is cancelled with :class:`asyncio.TimeoutError`
+    statuses : Iterable[int]
+        Status codes to be retried (defaults to 429, 500, 502, 503 and 504)
+    """
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        *,
+        base_delay: float = 0.1,
+        max_delay: float = 10.0,
+        deadline: Optional[float] = None,
+        statuses: Iterable[int] = (429, 500, 502, 503, 504)
+    ):
+        if max_attempts < 1:
+            raise ValueError('max_attempts must be at least 1')
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.statuses = frozenset(statuses)
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Returns a random delay in seconds before the retry following the given attempt
+
+        Parameters
+        ----------
+        attempt : int
+            Number of attempts made so far, starting at 1
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    @staticmethod
+    def retry_after(response: 'ClientResponse') -> Optional[float]:
+        """
+        Returns the delay in seconds asked for by the ``Retry-After`` header of a response, if any
+
+        Parameters
+        ----------
+        response : aiohttp.ClientResponse
+            Response to read the header from
+        """
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        from email.utils import parsedate_to_datetime
+
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    async def run(
+        self,
+        send: Callable[[], Awaitable['ClientResponse']],
+        *,
+        idempotent: bool = True
+    ) -> 'ClientResponse':
+        """
+        Send a request, retrying it according to this policy
+
+        Parameters
+        ----------
+        send : Callable[[], Awaitable[aiohttp.ClientResponse]]
+            Sends the request once, called again for every attempt
+        idempotent : bool
+            Whether the request can be safely repeated (defaults to True)
+
+        Returns
+        -------
+        aiohttp.ClientResponse
+            Response of the last attempt
+        """
+        loop = asyncio.get_event_loop()
+        started = loop.time()
+
+        def in_time(delay: float) -> bool:
+            return self.deadline is None or loop.time() - started + delay <= self.deadline
+
+        async def send_in_time() -> 'ClientResponse':
+            if self.deadline is None:
+                return await send()
+            return await asyncio.wait_for(send(), max(0.0, self.deadline - (loop.time() - started)))
+
+        if not idempotent:
+            return await send_in_time()
+        from aiohttp import ClientConnectionError
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = await send_in_time()
+            except (ClientConnectionError, asyncio.TimeoutError):
+                delay = self.backoff(attempt)
+                if attempt >= self.max_attempts or not in_time(delay):
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            if response.status not in self.statuses or attempt >= self.max_attempts:
+                return response
+            delay = self.retry_after(response)
+            if delay is None:
+                delay = self.backoff(attempt)
+            if not in_time(delay):
+                return response
+            response.release()
+            await asyncio.sleep(delay)
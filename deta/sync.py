@@ -0,0 +1,272 @@
+import asyncio
+import concurrent.futures
+import functools
+import inspect
+import os
+import threading
+from typing import Any, Awaitable, Callable, Iterator, Optional, Tuple
+
+from .buffer import BufferedWriter, UpdateCoalescer
+from .deta import Deta
+
+__all__ = ['SyncDeta', 'SyncBase', 'SyncDrive']
+
+
+async def _await(awaitable: Awaitable[Any]) -> Any:
+    return await awaitable
+
+
+class _LoopThread:
+    # event loop running forever in a daemon thread, coroutines are submitted to it from any thread
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='deta-loop', daemon=True)
+        self.thread.start()
+
+    def submit(self, awaitable: Awaitable[Any]) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(_await(awaitable), self.loop)
+
+    def run(self, awaitable: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        future = self.submit(awaitable)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+class _SyncProxy:
+    # runs every method of the wrapped object on the background loop and blocks until it is done
+    def __init__(self, target: Any, owner: 'SyncDeta'):
+        self._target = target
+        self._owner = owner
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+        if inspect.isasyncgenfunction(attribute):
+            return functools.wraps(attribute)(functools.partial(self._owner._iterate, attribute))
+        return functools.wraps(attribute)(functools.partial(self._owner._call, attribute))
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self._target!r}>'
+
+
+class _SyncBuffer(_SyncProxy):
+    # blocking BufferedWriter or UpdateCoalescer, flushed when leaving a with block
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class _SyncClient(_SyncProxy):
+    # base or drive created again from the current Deta instance whenever that changes, as it does in a
+    # forked process or after close, so that it is never used on the event loop of another thread
+    def __init__(self, create: Callable[[Deta], Any], owner: 'SyncDeta'):
+        self._create = create
+        self._owner = owner
+        self._deta: Optional[Deta] = None
+        self._bound: Any = None
+        # created right away, so that invalid options raise here
+        self._target
+
+    @property
+    def _target(self) -> Any:
+        _, deta = self._owner._ensure()
+        if deta is not self._deta:
+            self._bound = self._owner._call(self._create, deta)
+            self._deta = deta
+        return self._bound
+
+
+class SyncBase(_SyncClient):
+    """
+    Blocking counterpart of :class:`Base`, created with :meth:`SyncDeta.base`
+
+    Every method of :class:`Base` is available with the same arguments and blocks until it is done.
+    :meth:`Base.iterate` returns a regular iterator. :meth:`Base.writer` and :meth:`Base.coalescer`
+    return blocking wrappers as well, whose :meth:`BufferedWriter.put` returns a
+    :class:`concurrent.futures.Future`.
+    """
+
+
+class SyncDrive(_SyncClient):
+    """
+    Blocking counterpart of :class:`Drive`, created with :meth:`SyncDeta.drive`
+
+    Every method of :class:`Drive` is available with the same arguments and blocks until it is done,
+    except :meth:`get`, which returns the content of the file instead of a stream.
+    """
+
+    def get(self, name: str, *, _range: Optional[Tuple[int, int]] = None) -> bytes:
+        """
+        Get the content of a file from the drive
+
+        Parameters
+        ----------
+        name : str
+            Name of the file to get
+        _range : Tuple[int, int] | None
+            Range of bytes to get from the remote file buffer
+
+        Returns
+        -------
+        bytes
+            The content of the file
+
+        Raises
+        ------
+        NotFound
+            If the file is not found
+        BadRequest
+            If the range is invalid
+        """
+        async def _get() -> bytes:
+            stream = await self._target.get(name, _range=_range)
+            return await stream.read()
+
+        return self._owner._run(_get())
+
+
+class SyncDeta:
+    """
+    Blocking client for threaded code, like Django views or Celery tasks
+
+    A :class:`Deta` instance and its pooled client session live on an event loop running in a
+    background thread, which every call from any thread is handed to. The loop is started on
+    first use and started again in a process forked from the one it ran in, or after :meth:`close`.
+    Bases and drives created before are bound to the new loop on their next call.
+
+    Parameters
+    ----------
+    project_key : str
+        Project key to be used for requests
+    timeout : float | None
+        Maximum time in seconds to wait for a call, it is cancelled past it (defaults to no limit)
+    **options : Any
+        Other arguments passed on to :class:`Deta`, except ``session`` and ``loop``
+    """
+
+    def __init__(self, project_key: str, *, timeout: Optional[float] = None, **options: Any):
+        if not project_key:
+            raise ValueError('project key is required')
+        if 'session' in options or 'loop' in options:
+            raise ValueError('session and loop are managed by SyncDeta')
+        self.token = project_key
+        self.timeout = timeout
+        self.options = options
+        self._lock = threading.Lock()
+        self._thread: Optional[_LoopThread] = None
+        self._deta: Optional[Deta] = None
+        self._pid: Optional[int] = None
+
+    @classmethod
+    def from_env(cls, **options: Any) -> 'SyncDeta':
+        return cls(os.environ.get("DETA_PROJECT_KEY"), **options)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _ensure(self) -> Tuple[_LoopThread, Deta]:
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                thread = _LoopThread()
+
+                async def _create() -> Deta:
+                    return Deta(self.token, **self.options)
+
+                self._deta = thread.run(_create())
+                self._thread, self._pid = thread, os.getpid()
+            return self._thread, self._deta
+
+    def _run(self, awaitable: Awaitable[Any]) -> Any:
+        thread, _ = self._ensure()
+        return thread.run(awaitable, self.timeout)
+
+    def _wrap(self, result: Any) -> Any:
+        if isinstance(result, (BufferedWriter, UpdateCoalescer)):
+            return _SyncBuffer(result, self)
+        if isinstance(result, asyncio.Future):
+            return self._ensure()[0].submit(result)
+        return result
+
+    def _call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        async def _invoke() -> Any:
+            result = func(*args, **kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+
+        return self._wrap(self._run(_invoke()))
+
+    def _iterate(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Iterator[Any]:
+        iterator = func(*args, **kwargs)
+        try:
+            while True:
+                try:
+                    yield self._run(iterator.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self._run(iterator.aclose())
+
+    def base(self, name: str, **options: Any) -> SyncBase:
+        """
+        Creates a blocking instance of Base
+
+        Parameters
+        ----------
+        name : str
+            Name of the base
+        **options : Any
+            Other arguments passed on to :meth:`Deta.base`, like ``cache``
+
+        Returns
+        -------
+        SyncBase
+            Instance of SyncBase
+        """
+        return SyncBase(lambda deta: deta.base(name, **options), self)
+
+    def drive(self, name: str) -> SyncDrive:
+        """
+        Creates a blocking instance of Drive
+
+        Parameters
+        ----------
+        name : str
+            Name of the drive
+
+        Returns
+        -------
+        SyncDrive
+            Instance of SyncDrive
+        """
+        return SyncDrive(lambda deta: deta.drive(name), self)
+
+    def close(self):
+        """
+        Flush open writers of every base, close the client session and stop the background loop
+        """
+        with self._lock:
+            thread, deta = self._thread, self._deta
+            self._thread = self._deta = None
+        if thread is None:
+            return
+        try:
+            if self._pid == os.getpid():
+                thread.run(deta.close(), self.timeout)
+        finally:
+            thread.stop()
@@ -0,0 +1,413 @@
+"""
+In-process stand-in for the Deta Base & Drive HTTP API, meant for tests and benchmarks.
+
+Data is kept in memory and lost when the server is closed.
+"""
+import asyncio
+import bisect
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from .deta import Deta
+from .utils import Query
+
+__all__ = ['LocalDeta']
+
+MAX_UPLOAD_SIZE = 10485760  # 10MB
+
+
+def _errors(status: int, *messages: str) -> web.Response:
+    return web.json_response({"errors": list(messages)}, status=status)
+
+
+def _set_path(record: Dict[str, Any], field: str, value: Any):
+    *parents, last = field.split('.')
+    for part in parents:
+        record = record.setdefault(part, {})
+    record[last] = value
+
+
+def _delete_path(record: Dict[str, Any], field: str):
+    *parents, last = field.split('.')
+    for part in parents:
+        record = record.get(part)
+        if not isinstance(record, dict):
+            return
+    record.pop(last, None)
+
+
+class LocalDeta:
+    """
+    Local server implementing the Base and Drive endpoints used by this library
+
+    Any project key of the form ``<project_id>_<secret>`` is accepted.
+
+    Parameters
+    ----------
+    host : str
+        Interface to listen on (defaults to ``127.0.0.1``)
+    port : int
+        Port to listen on, 0 picks a free port (defaults to 0)
+    latency : float
+        Time in seconds every request is delayed by (defaults to 0)
+    error_rate : float
+        Probability of a request failing with ``error_status`` before being handled (defaults to 0)
+    error_status : int
+        Status code of injected errors (defaults to 503)
+    retry_after : float | None
+        Value of the ``Retry-After`` header sent with injected errors
+    seed : int | None
+        Seed for error injection, for reproducible runs
+
+    Examples
+    --------
+    ::
+
+        async with LocalDeta() as server:
+            async with server.client() as deta:
+                await deta.base('users').put(Record(key='1', name='John'))
+    """
+    def __init__(
+        self,
+        *,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        retry_after: Optional[float] = None,
+        seed: Optional[int] = None
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.bases: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = {}
+        self.drives: Dict[Tuple[str, str], Dict[str, bytes]] = {}
+        self.requests = 0
+        self._uploads: Dict[str, Dict[int, bytes]] = {}
+        self._sorted_keys: Dict[Tuple[str, str], List[str]] = {}
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        """
+        Scheme, host and port the server listens on
+        """
+        return f'http://{self.host}:{self.port}'
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    async def start(self):
+        """
+        Start listening for requests
+        """
+        app = web.Application(middlewares=[self._middleware], client_max_size=MAX_UPLOAD_SIZE * 2)
+        app.add_routes([
+            web.put('/v1/{project}/{name}/items', self._put_items),
+            web.post('/v1/{project}/{name}/items', self._insert_item),
+            web.get('/v1/{project}/{name}/items/{key}', self._get_item),
+            web.delete('/v1/{project}/{name}/items/{key}', self._delete_item),
+            web.patch('/v1/{project}/{name}/items/{key}', self._update_item),
+            web.post('/v1/{project}/{name}/query', self._query),
+            web.post('/v1/{project}/{name}/files', self._upload_file),
+            web.get('/v1/{project}/{name}/files', self._list_files),
+            web.delete('/v1/{project}/{name}/files', self._delete_files),
+            web.get('/v1/{project}/{name}/files/download', self._download_file),
+            web.post('/v1/{project}/{name}/uploads', self._start_upload),
+            web.post('/v1/{project}/{name}/uploads/{upload_id}/parts', self._upload_part),
+            web.patch('/v1/{project}/{name}/uploads/{upload_id}', self._finish_upload),
+            web.delete('/v1/{project}/{name}/uploads/{upload_id}', self._abort_upload),
+        ])
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def close(self):
+        """
+        Stop the server
+        """
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def client(self, project_key: str = 'local_key', **options: Any) -> Deta:
+        """
+        Creates a :class:`Deta` instance pointed at this server
+
+        Parameters
+        ----------
+        project_key : str
+            Project key to be used for requests (defaults to ``local_key``)
+        **options : Any
+            Other options passed on to :class:`Deta`
+        """
+        return Deta(project_key, base_host=self.url, drive_host=self.url, **options)
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        api_key = request.headers.get('X-API-Key', '')
+        if api_key.split('_')[0] != request.match_info.get('project') or len(api_key.split('_')) != 2:
+            return _errors(401, 'Unauthorized')
+        if self.error_rate and self._random.random() < self.error_rate:
+            response = _errors(self.error_status, 'Injected error')
+            if self.retry_after is not None:
+                response.headers['Retry-After'] = str(self.retry_after)
+            return response
+        return await handler(request)
+
+    # Base
+
+    def _base(self, request: web.Request, *, write: bool = False) -> Dict[str, Dict[str, Any]]:
+        name = (request.match_info['project'], request.match_info['name'])
+        if write:
+            self._sorted_keys.pop(name, None)
+        return self.bases.setdefault(name, {})
+
+    def _keys(self, request: web.Request) -> List[str]:
+        name = (request.match_info['project'], request.match_info['name'])
+        keys = self._sorted_keys.get(name)
+        if keys is None:
+            keys = self._sorted_keys[name] = sorted(self.bases.get(name, {}))
+        return keys
+
+    @staticmethod
+    def _expired(record: Dict[str, Any], now: float) -> bool:
+        expires = record.get('__expires')
+        return expires is not None and expires <= now
+
+    @staticmethod
+    def _with_key(item: Dict[str, Any]) -> Dict[str, Any]:
+        item = dict(item)
+        if item.get('key') is None:
+            item['key'] = uuid.uuid4().hex[:12]
+        else:
+            item['key'] = str(item['key'])
+        return item
+
+    async def _put_items(self, request: web.Request) -> web.Response:
+        store = self._base(request, write=True)
+        body = await request.json()
+        items = body.get('items')
+        if not isinstance(items, list) or not items:
+            return _errors(400, 'Items must be a non-empty list')
+        if len(items) > 25:
+            return _errors(400, 'Number of items in the request exceeds 25')
+        processed, failed = [], []
+        for item in items:
+            if not isinstance(item, dict):
+                failed.append(item)
+                continue
+            item = self._with_key(item)
+            store[item['key']] = item
+            processed.append(item)
+        result = {"processed": {"items": processed}}
+        if failed:
+            result["failed"] = {"items": failed}
+        return web.json_response(result, status=207)
+
+    async def _insert_item(self, request: web.Request) -> web.Response:
+        store = self._base(request, write=True)
+        body = await request.json()
+        if not isinstance(body.get('item'), dict):
+            return _errors(400, 'Item must be an object')
+        item = self._with_key(body['item'])
+        if item['key'] in store and not self._expired(store[item['key']], time.time()):
+            return _errors(409, 'Key already exists')
+        store[item['key']] = item
+        return web.json_response(item, status=201)
+
+    async def _get_item(self, request: web.Request) -> web.Response:
+        key = request.match_info['key']
+        record = self._base(request).get(key)
+        if record is None or self._expired(record, time.time()):
+            return web.json_response({"key": key}, status=404)
+        return web.json_response(record)
+
+    async def _delete_item(self, request: web.Request) -> web.Response:
+        key = request.match_info['key']
+        self._base(request, write=True).pop(key, None)
+        return web.json_response({"key": key})
+
+    async def _update_item(self, request: web.Request) -> web.Response:
+        key = request.match_info['key']
+        record = self._base(request).get(key)
+        if record is None or self._expired(record, time.time()):
+            return _errors(404, 'Key not found')
+        body = await request.json()
+        try:
+            for field, value in (body.get('set') or {}).items():
+                _set_path(record, field, value)
+            for field, value in (body.get('increment') or {}).items():
+                record[field] = record.get(field, 0) + value
+            for field, value in (body.get('append') or {}).items():
+                record[field] = list(record.get(field, [])) + (value if isinstance(value, list) else [value])
+            for field, value in (body.get('prepend') or {}).items():
+                record[field] = (value if isinstance(value, list) else [value]) + list(record.get(field, []))
+            for field in body.get('delete') or []:
+                _delete_path(record, field)
+        except TypeError as e:
+            return _errors(400, str(e))
+        return web.json_response({"key": key, **body})
+
+    async def _query(self, request: web.Request) -> web.Response:
+        store = self._base(request)
+        body = await request.json()
+        queries = []
+        for payload in body.get('query') or []:
+            query = Query()
+            query._payload = payload
+            queries.append(query)
+        try:
+            match = Query.compile_any(queries)
+        except ValueError as e:
+            return _errors(400, str(e))
+        limit = body.get('limit') or 1000
+        last = body.get('last')
+        keys = self._keys(request)
+        if body.get('sort') == 'desc':
+            keys = reversed(keys[:bisect.bisect_left(keys, last)] if last is not None else keys)
+        elif last is not None:
+            keys = keys[bisect.bisect_right(keys, last):]
+        now = time.time()
+        items = []
+        more = False
+        for key in keys:
+            record = store[key]
+            if not self._expired(record, now) and match(record):
+                if len(items) == limit:
+                    more = True
+                    break
+                items.append(record)
+        paging: Dict[str, Any] = {"size": len(items)}
+        if more:
+            paging["last"] = items[-1]['key']
+        return web.json_response({"paging": paging, "items": items})
+
+    # Drive
+
+    def _drive(self, request: web.Request) -> Dict[str, bytes]:
+        return self.drives.setdefault((request.match_info['project'], request.match_info['name']), {})
+
+    def _file_info(self, request: web.Request, name: str, **extra: Any) -> Dict[str, Any]:
+        return {
+            "name": name,
+            "project_id": request.match_info['project'],
+            "drive_name": request.match_info['name'],
+            **extra
+        }
+
+    async def _upload_file(self, request: web.Request) -> web.Response:
+        name = request.query.get('name')
+        if not name:
+            return _errors(400, 'Name is required')
+        content = await request.read()
+        if len(content) > MAX_UPLOAD_SIZE:
+            return web.Response(status=413)
+        self._drive(request)[name] = content
+        return web.json_response(self._file_info(request, name), status=201)
+
+    async def _list_files(self, request: web.Request) -> web.StreamResponse:
+        if 'name' in request.query:
+            # Drive.size_of reads the first byte of a single file from the listing endpoint
+            return await self._download_file(request)
+        try:
+            limit = int(request.query.get('limit') or 1000)
+        except ValueError:
+            return _errors(400, 'Invalid limit')
+        prefix = request.query.get('prefix') or ''
+        last = request.query.get('last')
+        names = [
+            name for name in sorted(self._drive(request))
+            if name.startswith(prefix) and (last is None or name > last)
+        ]
+        result: Dict[str, Any] = {"names": names[:limit]}
+        if len(names) > limit:
+            result["paging"] = {"size": limit, "last": names[limit - 1]}
+        return web.json_response(result)
+
+    async def _delete_files(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        names: List[str] = body.get('names') or []
+        if len(names) > 1000:
+            return _errors(400, 'Cannot delete more than 1000 files at a time')
+        drive = self._drive(request)
+        for name in names:
+            drive.pop(name, None)
+        return web.json_response({"deleted": names, "failed": {}})
+
+    async def _download_file(self, request: web.Request) -> web.StreamResponse:
+        content = self._drive(request).get(request.query.get('name', ''))
+        if content is None:
+            return _errors(404, 'File not found')
+        range_header = request.headers.get('Range')
+        if not range_header:
+            return web.Response(body=content, content_type='application/octet-stream')
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', range_header)
+        if not match or int(match.group(1)) >= len(content):
+            return _errors(400, 'Invalid range')
+        start = int(match.group(1))
+        end = min(int(match.group(2) or len(content) - 1), len(content) - 1)
+        return web.Response(
+            status=206,
+            body=content[start:end + 1],
+            content_type='application/octet-stream',
+            headers={'Content-Range': f'bytes {start}-{end}/{len(content)}'}
+        )
+
+    async def _start_upload(self, request: web.Request) -> web.Response:
+        name = request.query.get('name')
+        if not name:
+            return _errors(400, 'Name is required')
+        upload_id = uuid.uuid4().hex
+        self._uploads[upload_id] = {}
+        return web.json_response(self._file_info(request, name, upload_id=upload_id), status=202)
+
+    async def _upload_part(self, request: web.Request) -> web.Response:
+        parts = self._uploads.get(request.match_info['upload_id'])
+        if parts is None:
+            return _errors(404, 'Upload not found')
+        try:
+            part = int(request.query.get('part', ''))
+        except ValueError:
+            return _errors(400, 'Invalid part number')
+        content = await request.read()
+        if len(content) > MAX_UPLOAD_SIZE:
+            return web.Response(status=413)
+        parts[part] = content
+        return web.json_response(self._file_info(request, request.query.get('name', ''), part=part))
+
+    async def _finish_upload(self, request: web.Request) -> web.Response:
+        upload_id = request.match_info['upload_id']
+        parts = self._uploads.pop(upload_id, None)
+        if parts is None:
+            return _errors(404, 'Upload not found')
+        if sorted(parts) != list(range(1, len(parts) + 1)):
+            return _errors(400, 'Missing parts')
+        name = request.query.get('name', '')
+        self._drive(request)[name] = b''.join(parts[i] for i in sorted(parts))
+        return web.json_response(self._file_info(request, name, upload_id=upload_id))
+
+    async def _abort_upload(self, request: web.Request) -> web.Response:
+        upload_id = request.match_info['upload_id']
+        if self._uploads.pop(upload_id, None) is None:
+            return _errors(404, 'Upload not found')
+        return web.json_response(self._file_info(request, request.query.get('name', ''), upload_id=upload_id))
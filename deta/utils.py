@@ -1,12 +1,232 @@
-from datetime import datetime, timedelta
-from typing import List, Dict, Union, Any, Optional
+import array
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import (
+    List, Dict, Union, Any, Optional, Iterable, AsyncIterable, AsyncIterator, Callable, Awaitable, TypeVar, Tuple,
+    Mapping, Sequence, Set
+)
+
+T = TypeVar('T')
 
 
 def time_converter(time_value: Union[int, float, datetime]) -> float:
     if isinstance(time_value, datetime):
         return time_value.replace(microsecond=0).timestamp()
     else:
-        return (datetime.now() + timedelta(seconds=time_value)).replace(microsecond=0).timestamp()
+        return float(int(time.time() + time_value))
+
+
+async def _aiter(iterable: Union[Iterable[T], AsyncIterable[T]]) -> AsyncIterator[T]:
+    if hasattr(iterable, '__aiter__'):
+        async for item in iterable:  # type: ignore
+            yield item
+    else:
+        for item in iterable:  # type: ignore
+            yield item
+
+
+async def _batched(iterable: Union[Iterable[T], AsyncIterable[T]], size: int) -> AsyncIterator[List[T]]:
+    batch = []
+    async for item in _aiter(iterable):
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _gather_bounded(
+    func: Callable[[T], Awaitable[Any]],
+    args: Union[Iterable[T], AsyncIterable[T]],
+    concurrency: int
+):
+    # Runs ``func`` over ``args`` with at most ``concurrency`` calls in flight.
+    # ``args`` is consumed lazily and only running calls are kept, so large or unbounded
+    # inputs are never materialised. Results are dropped; the first error cancels everything else.
+    if concurrency < 1:
+        raise ValueError('concurrency must be at least 1')
+    semaphore = asyncio.Semaphore(concurrency)
+    pending: Set[asyncio.Task] = set()
+    errors: List[BaseException] = []
+
+    def _on_done(task: asyncio.Task):
+        pending.discard(task)
+        semaphore.release()
+        if not task.cancelled() and task.exception():
+            errors.append(task.exception())
+
+    try:
+        async for arg in _aiter(args):
+            await semaphore.acquire()
+            if errors:
+                break
+            task = asyncio.ensure_future(func(arg))
+            task.add_done_callback(_on_done)
+            pending.add(task)
+        while pending and not errors:
+            await asyncio.wait(set(pending), return_when=asyncio.FIRST_EXCEPTION)
+        if errors:
+            raise errors[0]
+    finally:
+        for task in list(pending):
+            task.cancel()
+
+
+def _compact_encode(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def _stable_dumps(obj: Any, encode: Callable[[Any], bytes]) -> str:
+    # key order independent encoding for identity keys, values the standard encoder
+    # does not know, like datetimes, are left to the encoder of the client
+    try:
+        return json.dumps(obj, sort_keys=True, separators=(',', ':'))
+    except TypeError:
+        return encode(obj).decode('utf-8')
+
+
+def _read_checkpoint(path: Union[str, os.PathLike]) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'rb') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def _write_checkpoint(path: Union[str, os.PathLike], state: Dict[str, Any]):
+    # written to a temporary file first, so an interruption never leaves a torn checkpoint behind
+    temp = f'{os.fspath(path)}.tmp'
+    with open(temp, 'w') as file:
+        json.dump(state, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp, path)
+
+
+def _remove_checkpoint(path: Union[str, os.PathLike]):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+_ABSENT = object()
+
+
+def _resolve(record: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    value = record
+    for part in path:
+        if not isinstance(value, dict):
+            return _ABSENT
+        value = value.get(part, _ABSENT)
+        if value is _ABSENT:
+            return _ABSENT
+    return value
+
+
+def _same(a: Any, b: Any) -> bool:
+    # JSON tells booleans and numbers apart, Python does not
+    return a == b and isinstance(a, bool) == isinstance(b, bool)
+
+
+def _has(container: Any, value: Any) -> bool:
+    if isinstance(container, str):
+        return isinstance(value, str) and value in container
+    if isinstance(container, list):
+        return any(_same(item, value) for item in container)
+    return False
+
+
+def _ordered(compare: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    def check(a: Any, b: Any) -> bool:
+        if a is _ABSENT or isinstance(a, bool) != isinstance(b, bool):
+            return False
+        try:
+            return compare(a, b)
+        except TypeError:
+            return False
+    return check
+
+
+_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    '': lambda a, b: a is not _ABSENT and _same(a, b),
+    'ne': lambda a, b: a is _ABSENT or not _same(a, b),
+    'gt': _ordered(lambda a, b: a > b),
+    'gte': _ordered(lambda a, b: a >= b),
+    'lt': _ordered(lambda a, b: a < b),
+    'lte': _ordered(lambda a, b: a <= b),
+    'contains': lambda a, b: _has(a, b),
+    'not_contains': lambda a, b: not _has(a, b),
+    'r': _ordered(lambda a, b: b[0] <= a <= b[1]),
+    'pfx': lambda a, b: isinstance(a, str) and a.startswith(b),
+}
+
+
+def _as_list(value: Any) -> List[Any]:
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def _numeric_kind(values: List[Any]) -> Optional[str]:
+    # typecode of an array able to hold all values, None if one of them is not a number
+    kind = 'q'
+    for value in values:
+        cls = type(value)
+        if cls is float:
+            kind = 'd'
+        elif cls is not int:
+            return None
+    return kind
+
+
+class _Columns:
+    # builds column-oriented results from pages of records, see Base.fetch_all
+    __slots__ = ('fields', 'typed', 'columns', 'rows')
+
+    def __init__(self, fields: Optional[Sequence[str]] = None, *, typed: bool = False):
+        self.fields = list(fields) if fields is not None else None
+        self.typed = typed
+        self.columns: Dict[str, Union[List[Any], array.array]] = {}
+        self.rows = 0
+
+    def extend(self, items: List[Dict[str, Any]]):
+        if not items:
+            return
+        if self.fields is not None:
+            fields = self.fields
+        else:
+            fields = list(self.columns)
+            known = set(fields)
+            for item in items:
+                for field in item:
+                    if field not in known:
+                        known.add(field)
+                        fields.append(field)
+        for field in fields:
+            self._append(field, [item.get(field) for item in items])
+        self.rows += len(items)
+
+    def _append(self, field: str, values: List[Any]):
+        column = self.columns.get(field)
+        if column is None:
+            # fields showing up after the first page are padded with None, so they can't be typed
+            column = array.array('q') if self.typed and not self.rows else [None] * self.rows
+            self.columns[field] = column
+        if isinstance(column, array.array):
+            kind = _numeric_kind(values)
+            if kind == 'd' and column.typecode == 'q':
+                column = self.columns[field] = array.array('d', column)
+            if kind:
+                try:
+                    column.extend(values)
+                    return
+                except OverflowError:
+                    del column[self.rows:]
+            column = self.columns[field] = column.tolist()
+        column.extend(values)
 
 
 class Record:
@@ -22,6 +242,8 @@ class Record:
     expire_after : int | float
         Time in seconds after which the record will expire
     """
+    __slots__ = ('key', 'expire_at', 'expire_after', 'payload')
+
     def __init__(
         self,
         key: Optional[str] = None,
@@ -43,6 +265,62 @@ class Record:
         if expire_at:
             self.payload["__expires"] = time_converter(expire_at)
 
+    def __repr__(self):
+        return f'<Record key={self.key!r}>'
+
+    @classmethod
+    def bulk(
+        cls,
+        rows: Union[Iterable[Dict[str, Any]], Mapping[str, Sequence[Any]]],
+        *,
+        key_field: str = 'key',
+        expire_at: Optional[datetime] = None,
+        expire_after: Optional[Union[int, float]] = None
+    ) -> List['Record']:
+        """
+        Create many records at once
+
+        The expiry is computed once for the whole batch and row dictionaries are used
+        as the payloads of the records as they are, so they are modified in place.
+
+        Parameters
+        ----------
+        rows : Iterable[Dict[str, Any]] | Mapping[str, Sequence[Any]]
+            Fields of every record, or a mapping of field names to columns of values
+        key_field : str
+            Field holding the key of a record, rows without it get a key from the base (defaults to ``key``)
+        expire_at : datetime
+            Unix time at which the records will expire
+        expire_after : int | float
+            Time in seconds after which the records will expire
+
+        Returns
+        -------
+        List[Record]
+            The records, in the order of the rows
+        """
+        if expire_after and expire_at:
+            raise ValueError('expire_after and expire_at are mutually exclusive')
+        expires = time_converter(expire_after or expire_at) if expire_after or expire_at else None
+        if isinstance(rows, Mapping):
+            fields = list(rows)
+            rows = (dict(zip(fields, values)) for values in zip(*rows.values()))
+        records = []
+        new = cls.__new__
+        for payload in rows:
+            key = payload.get(key_field)
+            if key_field != 'key' and key is not None:
+                payload['key'] = key
+            if expires is not None:
+                payload['__expires'] = expires
+            record = new(cls)
+            record.key = key
+            record.expire_at = expire_at
+            record.expire_after = expire_after
+            record.payload = payload
+            records.append(record)
+        return records
+
 
 class Updater:
     """
@@ -118,6 +396,52 @@ class Updater:
         """
         self._delete.append(field)
     
+    def _operations(self) -> Dict[str, str]:
+        operations = {}
+        for name in ('set', 'increment', 'append', 'prepend'):
+            for field in getattr(self, f'_{name}'):
+                operations[field] = name
+        for field in self._delete:
+            operations[field] = 'delete'
+        return operations
+
+    def _idempotent(self) -> bool:
+        # repeating an increment, append or prepend changes the record again
+        return not (self._increment or self._append or self._prepend)
+
+    def merge(self, other: 'Updater') -> bool:
+        """
+        Merge the operations of another updater into this one, as if they were applied after this one
+
+        Increments are summed, the last set wins, appended and prepended lists are concatenated
+        and deleted fields are unioned.
+
+        Parameters
+        ----------
+        other : Updater
+            Updater whose operations are to be merged
+
+        Returns
+        -------
+        bool
+            False, leaving this updater unchanged, if both updaters apply different operations to the same field
+        """
+        ours = self._operations()
+        for field, operation in other._operations().items():
+            if ours.get(field, operation) != operation:
+                return False
+        self._set.update(other._set)
+        for field, value in other._increment.items():
+            self._increment[field] = self._increment.get(field, 0) + value
+        for field, value in other._append.items():
+            self._append[field] = _as_list(self._append.get(field, [])) + _as_list(value)
+        for field, value in other._prepend.items():
+            self._prepend[field] = _as_list(value) + _as_list(self._prepend.get(field, []))
+        for field in other._delete:
+            if field not in self._delete:
+                self._delete.append(field)
+        return True
+
     def json(self) -> Dict[str, Any]:
         payload = {}
         if self._set:
@@ -200,5 +524,173 @@ class Query:
         """
         self._payload[f"{field}?pfx"] = value
 
+    def copy(self) -> 'Query':
+        """
+        Returns a new query with the same operators
+        """
+        query = Query()
+        query._payload = dict(self._payload)
+        return query
+
+    def compile(self) -> Callable[[Dict[str, Any]], bool]:
+        """
+        Compiles the query into a predicate which tells whether a record matches it
+
+        All operators of the query must hold for a record to match. Nested fields are addressed with dots.
+        Later changes to the query do not affect an already compiled predicate.
+
+        Returns
+        -------
+        Callable[[Dict[str, Any]], bool]
+            Predicate to be called with a record
+        """
+        conditions = []
+        for field, value in self._payload.items():
+            name, _, operator = field.rpartition('?') if '?' in field else (field, '', '')
+            if operator not in _OPERATORS:
+                raise ValueError(f'unknown query operator `{operator}`')
+            conditions.append((tuple(name.split('.')), _OPERATORS[operator], value))
+
+        def predicate(record: Dict[str, Any]) -> bool:
+            for path, check, expected in conditions:
+                if not check(_resolve(record, path), expected):
+                    return False
+            return True
+
+        return predicate
+
+    @staticmethod
+    def compile_any(queries: Optional[List['Query']]) -> Callable[[Dict[str, Any]], bool]:
+        """
+        Compiles a list of queries into a predicate which matches records matching any of them,
+        the same way the list is applied by :meth:`Base.fetch`
+
+        Parameters
+        ----------
+        queries : List[Query] | None
+            List of Query objects, an empty list or None matches every record
+
+        Returns
+        -------
+        Callable[[Dict[str, Any]], bool]
+            Predicate to be called with a record
+        """
+        predicates = [query.compile() for query in queries or []]
+        if not predicates:
+            return lambda record: True
+        if len(predicates) == 1:
+            return predicates[0]
+        return lambda record: any(predicate(record) for predicate in predicates)
+
     def json(self) -> Dict[str, Any]:
         return self._payload
+
+
+class PreparedQuery:
+    """
+    List of queries normalised and encoded once, created with :meth:`Base.prepare`
+
+    Duplicate queries and queries subsumed by a less restrictive one are dropped, since the
+    queries of a fetch are alternatives, and fields are sorted. The request body is kept encoded,
+    only the cursor of a following page is spliced into it.
+
+    Parameters
+    ----------
+    queries : List[Query] | None
+        List of Query objects to be applied to the fetch operation
+    limit : int | None
+        Maximum number of records per fetch (defaults to 1000)
+    sort : bool
+        Whether to sort the results by key in descending order (defaults to False)
+    encode : Callable[[Any], bytes] | None
+        Function encoding the request body (defaults to compact :func:`json.dumps`)
+
+    Attributes
+    ----------
+    queries : List[Dict[str, Any]]
+        The normalised queries
+    key : str
+        Stable identity of the queries, limit and sort
+    """
+    __slots__ = ('queries', 'limit', 'sort', 'key', '_body', '_encode')
+
+    def __init__(
+        self,
+        queries: Optional[List[Query]] = None,
+        *,
+        limit: Optional[int] = None,
+        sort: bool = False,
+        encode: Optional[Callable[[Any], bytes]] = None
+    ):
+        self._encode = encode or _compact_encode
+        self.queries = self.normalise(queries or [], encode=self._encode)
+        self.limit = limit
+        self.sort = sort
+        payload = self._payload(self.queries, limit, sort)
+        self.key = self._identity(self.queries, limit, sort, self._encode)
+        self._body = self._encode(payload).rstrip()
+
+    def __repr__(self):
+        return f'<PreparedQuery {self.key}>'
+
+    @staticmethod
+    def _payload(queries: List[Dict[str, Any]], limit: Optional[int], sort: bool) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {'query': queries}
+        if limit:
+            payload['limit'] = limit
+        if sort:
+            payload['sort'] = 'desc'
+        return payload
+
+    @classmethod
+    def _identity(
+        cls,
+        queries: List[Union[Query, Dict[str, Any]]],
+        limit: Optional[int],
+        sort: bool,
+        encode: Optional[Callable[[Any], bytes]] = None
+    ) -> str:
+        # identity of the queries, normalised unless they already are
+        encode = encode or _compact_encode
+        if any(isinstance(query, Query) for query in queries):
+            queries = cls.normalise(queries, encode=encode)
+        return _stable_dumps(cls._payload(queries, limit, sort), encode)
+
+    @staticmethod
+    def normalise(queries: List[Query], *, encode: Optional[Callable[[Any], bytes]] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the queries without duplicates and subsumed queries, with sorted fields, in a stable order
+
+        Parameters
+        ----------
+        queries : List[Query]
+            Queries to be normalised
+        encode : Callable[[Any], bytes] | None
+            Function encoding values :func:`json.dumps` can't, like datetimes (defaults to compact :func:`json.dumps`)
+        """
+        encode = encode or _compact_encode
+        found: Dict[frozenset, Dict[str, Any]] = {}
+        for query in queries:
+            payload = query.json()
+            conditions = frozenset((field, _stable_dumps(value, encode)) for field, value in payload.items())
+            found.setdefault(conditions, payload)
+        if frozenset() in found:
+            # an empty query matches every record
+            return []
+        # a query with a superset of the conditions of another one can only match records the other matches too
+        kept = [conditions for conditions in found if not any(other < conditions for other in found)]
+        kept.sort(key=sorted)
+        return [dict(sorted(found[conditions].items())) for conditions in kept]
+
+    def body(self, last: Optional[str] = None) -> bytes:
+        """
+        Returns the encoded request body, continuing after the given cursor
+
+        Parameters
+        ----------
+        last : str | None
+            Key of the last record fetched in the previous fetch operation
+        """
+        if not last:
+            return self._body
+        return b''.join((self._body[:-1], b',"last":', self._encode(last), b'}'))
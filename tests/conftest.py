@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from deta.testing import LocalDeta
+
+
+@pytest.fixture
+def local():
+    """
+    Runs a coroutine function with a fresh :class:`LocalDeta` server and a client pointed at it
+    """
+    def run(test, *, server=None, **options):
+        async def main():
+            async with LocalDeta(**(server or {})) as local_server:
+                async with local_server.client(**options) as deta:
+                    await test(local_server, deta)
+
+        asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def hold_reads():
+    """
+    Holds back answered requests of one operation of a base until the returned release event is set
+    """
+    def hold(base, operation):
+        answered, release = asyncio.Event(), asyncio.Event()
+        request = base._request
+
+        async def _request(name, *args, **kwargs):
+            response = await request(name, *args, **kwargs)
+            if name == operation and not release.is_set():
+                answered.set()
+                await release.wait()
+            return response
+
+        base._request = _request
+        return answered, release
+
+    return hold
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from deta import Record
+
+
+def test_full_batches_are_flushed_at_once(local):
+    async def test(server, deta):
+        base = deta.base('writer')
+        requests = server.requests
+        async with base.writer(max_batch=10, max_delay_ms=10000) as writer:
+            futures = [await writer.put(Record(key=str(i))) for i in range(20)]
+            await asyncio.wait_for(asyncio.gather(*futures), 1)
+            assert server.requests == requests + 2
+        assert [future.result()['key'] for future in futures] == [str(i) for i in range(20)]
+
+    local(test)
+
+
+def test_partial_batch_is_flushed_after_delay(local):
+    async def test(server, deta):
+        base = deta.base('writer')
+        writer = base.writer(max_delay_ms=20)
+        future = await writer.put(Record(key='a'))
+        assert (await asyncio.wait_for(future, 1))['key'] == 'a'
+        assert len(await base.fetch_all()) == 1
+        await writer.close()
+
+    local(test)
+
+
+def test_close_flushes_queued_records(local):
+    async def test(server, deta):
+        base = deta.base('writer')
+        writer = base.writer(max_delay_ms=10000)
+        futures = [await writer.put(Record(key=str(i))) for i in range(5)]
+        await writer.close()
+        assert all(future.done() for future in futures)
+        assert len(await base.fetch_all()) == 5
+        with pytest.raises(RuntimeError):
+            await writer.put(Record(key='late'))
+
+    local(test)
+
+
+def test_deta_close_flushes_writers(local):
+    async def test(server, deta):
+        base = deta.base('writer')
+        writer = base.writer(max_delay_ms=10000)
+        await writer.put(Record(key='a'))
+        await deta.close()
+        assert writer.closed
+        assert server.bases[('local', 'writer')].keys() == {'a'}
+
+    local(test)
+
+
+def test_failed_batch_fails_its_futures(local):
+    async def test(server, deta):
+        base = deta.base('writer')
+
+        async def failing(*records):
+            raise ConnectionResetError('reset')
+
+        base.put = failing
+        async with base.writer(max_delay_ms=1) as writer:
+            future = await writer.put(Record(key='a'))
+            await writer.flush()
+            with pytest.raises(ConnectionResetError):
+                future.result()
+
+    local(test)
+
+
+def test_invalid_batch_size(local):
+    async def test(server, deta):
+        with pytest.raises(ValueError):
+            deta.base('writer').writer(max_batch=26)
+
+    local(test)
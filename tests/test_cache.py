@@ -0,0 +1,174 @@
+import asyncio
+import time
+
+import pytest
+
+from deta import Cache, NotFound, QueryCache, Record, Updater
+from deta.cache import _MISSING, _NOT_FOUND
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = Cache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache._get('a') == 1
+    cache.set('c', 3)
+    assert cache._get('b') is _MISSING
+    assert cache._get('a') == 1
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire():
+    cache = Cache(ttl=0.05, negative_ttl=0)
+    cache.set('a', 1)
+    cache.set('b', 2, expires_at=time.time() - 1)
+    cache.set_missing('c')
+    assert cache._get('a') == 1
+    assert cache._get('b') is _MISSING
+    assert cache._get('c') is _MISSING
+    time.sleep(0.06)
+    assert cache._get('a') is _MISSING
+
+
+def test_missing_keys():
+    cache = Cache()
+    cache.set_missing('a')
+    assert cache._get('a') is _NOT_FOUND
+    cache.invalidate('a')
+    assert cache._get('a') is _MISSING
+
+
+def test_stale_generation_is_not_stored():
+    cache = Cache()
+    generation = cache.generation
+    cache.invalidate('a')
+    cache.set('a', 1, generation=generation)
+    cache.set_missing('a', generation=generation)
+    assert len(cache) == 0
+    cache.set('a', 1, generation=cache.generation)
+    assert cache._get('a') == 1
+
+
+def test_invalidation_of_other_keys_does_not_skip_reads():
+    cache = Cache()
+    generation = cache.generation
+    cache.invalidate('b')
+    cache.set('a', 1, generation=generation)
+    assert cache._get('a') == 1
+
+
+def test_reads_older_than_remembered_invalidations_are_skipped():
+    cache = Cache(maxsize=2)
+    generation = cache.generation
+    for key in 'abc':
+        cache.invalidate(key)
+    cache.set('a', 1, generation=generation)
+    cache.set('d', 1, generation=generation)
+    assert len(cache) == 0
+    cache.set('d', 1, generation=cache.generation)
+    assert cache._get('d') == 1
+
+
+def test_clear_skips_reads_in_flight():
+    cache = Cache()
+    generation = cache.generation
+    cache.clear()
+    cache.set('a', 1, generation=generation)
+    assert len(cache) == 0
+
+
+def test_reads_are_served_from_cache(local):
+    async def test(server, deta):
+        base = deta.base('cache', cache=Cache())
+        await base.put(Record(key='a', value=1))
+        requests = server.requests
+        assert (await base.get('a'))['value'] == 1
+        assert (await base.get('a'))['value'] == 1
+        assert await base.get_many(['a']) == {'a': {'key': 'a', 'value': 1}}
+        assert server.requests == requests + 1
+        assert base.cache.stats()['hits'] == 2
+
+    local(test)
+
+
+def test_writes_invalidate_cached_records(local):
+    async def test(server, deta):
+        base = deta.base('cache', cache=Cache(negative_ttl=60))
+        await base.put(Record(key='a', value=1))
+        assert (await base.get('a'))['value'] == 1
+
+        await base.put(Record(key='a', value=2))
+        assert (await base.get('a'))['value'] == 2
+
+        updater = Updater()
+        updater.set('value', 3)
+        await base.update('a', updater)
+        assert (await base.get('a'))['value'] == 3
+
+        await base.delete('a')
+        with pytest.raises(NotFound):
+            await base.get('a')
+        await base.insert(Record(key='a', value=4))
+        assert (await base.get('a'))['value'] == 4
+
+    local(test)
+
+
+def test_writes_with_both_caches(local):
+    async def test(server, deta):
+        base = deta.base('cache', cache=Cache(), query_cache=QueryCache())
+        await base.put(Record(key='a', value=1))
+        assert (await base.get('a'))['value'] == 1
+        assert len((await base.fetch())['items']) == 1
+
+        await base.put(Record(key='a', value=2))
+        assert (await base.get('a'))['value'] == 2
+        assert (await base.fetch())['items'] == [{'key': 'a', 'value': 2}]
+
+    local(test)
+
+
+def test_read_overlapping_a_write_is_not_cached(local, hold_reads):
+    async def test(server, deta):
+        base = deta.base('cache', cache=Cache())
+        await base.put(Record(key='a', value=1))
+        answered, release = hold_reads(base, 'get')
+        stale = asyncio.ensure_future(base.get('a'))
+        await answered.wait()
+        await base.put(Record(key='a', value=2))
+        release.set()
+        assert (await stale)['value'] == 1
+        assert (await base.get('a'))['value'] == 2
+
+    local(test)
+
+
+def test_read_overlapping_a_write_to_another_key_is_cached(local, hold_reads):
+    async def test(server, deta):
+        base = deta.base('cache', cache=Cache())
+        await base.put(Record(key='a', value=1))
+        answered, release = hold_reads(base, 'get')
+        read = asyncio.ensure_future(base.get('a'))
+        await answered.wait()
+        await base.put(Record(key='b'))
+        release.set()
+        await read
+        requests = server.requests
+        assert (await base.get('a'))['value'] == 1
+        assert server.requests == requests
+
+    local(test)
+
+
+def test_lookup_overlapping_a_write_is_not_cached(local, hold_reads):
+    async def test(server, deta):
+        base = deta.base('cache', cache=Cache(negative_ttl=60))
+        answered, release = hold_reads(base, 'fetch')
+        stale = asyncio.ensure_future(base.get_many(['a', 'b']))
+        await answered.wait()
+        await base.put(Record(key='a'))
+        release.set()
+        assert await stale == {'a': None, 'b': None}
+        assert await base.get_many(['a', 'b']) == {'a': {'key': 'a'}, 'b': None}
+
+    local(test)
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from deta import NotFound, Record, Updater
+
+
+def _updater(**operations):
+    updater = Updater()
+    for name, (field, *args) in operations.items():
+        getattr(updater, name)(field, *args)
+    return updater
+
+
+def test_merge_rules():
+    first = Updater()
+    first.set('name', 'a')
+    first.increment('count', 2)
+    first.append('log', ['x'])
+    first.prepend('stack', 'b')
+    first.delete('old')
+    second = Updater()
+    second.set('name', 'b')
+    second.set('other', 1)
+    second.increment('count', -5)
+    second.increment('total')
+    second.append('log', 'y')
+    second.prepend('stack', ['a'])
+    second.delete('old')
+    second.delete('older')
+    assert first.merge(second)
+    assert first.json() == {
+        'set': {'name': 'b', 'other': 1},
+        'increment': {'count': -3, 'total': 1},
+        'append': {'log': ['x', 'y']},
+        'prepend': {'stack': ['a', 'b']},
+        'delete': ['old', 'older'],
+    }
+
+
+@pytest.mark.parametrize('first, second', [
+    (_updater(set=('a', 1)), _updater(increment=('a',))),
+    (_updater(increment=('a',)), _updater(delete=('a',))),
+    (_updater(append=('a', [1])), _updater(prepend=('a', [1]))),
+    (_updater(delete=('a',)), _updater(set=('a', 1))),
+])
+def test_conflicting_operations_are_not_merged(first, second):
+    before = first.json()
+    assert not first.merge(second)
+    assert first.json() == before
+
+
+def test_merge_keeps_the_other_updater():
+    first, second = Updater(), _updater(append=('log', [1]))
+    assert first.merge(second)
+    first.merge(_updater(append=('log', [2])))
+    assert second.json() == {'append': {'log': [1]}}
+
+
+def test_concurrent_updates_are_sent_once(local):
+    async def test(server, deta):
+        base = deta.base('coalesce')
+        await base.put(Record(key='a', count=0, log=[]))
+        requests = server.requests
+        async with base.coalescer(max_delay_ms=20) as coalescer:
+            results = await asyncio.gather(*(
+                coalescer.update('a', _updater(increment=('count',), append=('log', [i]))) for i in range(10)
+            ))
+        assert server.requests == requests + 1
+        assert all(result is results[0] for result in results)
+        record = await base.get('a')
+        assert record['count'] == 10
+        assert record['log'] == list(range(10))
+
+    local(test)
+
+
+def test_conflicting_update_is_sent_after_pending_one(local):
+    async def test(server, deta):
+        base = deta.base('coalesce')
+        await base.put(Record(key='a', value=0))
+        async with base.coalescer(max_delay_ms=20) as coalescer:
+            await asyncio.gather(
+                coalescer.update('a', _updater(increment=('value', 5))),
+                coalescer.update('a', _updater(set=('value', 1))),
+                coalescer.update('a', _updater(increment=('value', 2))),
+            )
+        assert (await base.get('a'))['value'] == 3
+
+    local(test)
+
+
+def test_keys_are_sent_separately(local):
+    async def test(server, deta):
+        base = deta.base('coalesce')
+        await base.put_many([Record(key='a', n=0), Record(key='b', n=0)])
+        async with base.coalescer() as coalescer:
+            await asyncio.gather(
+                coalescer.update('a', _updater(increment=('n',))),
+                coalescer.update('b', _updater(increment=('n', 2))),
+            )
+        assert await base.get_many(['a', 'b']) == {'a': {'key': 'a', 'n': 1}, 'b': {'key': 'b', 'n': 2}}
+
+    local(test)
+
+
+def test_errors_reach_every_caller(local):
+    async def test(server, deta):
+        base = deta.base('coalesce')
+        async with base.coalescer() as coalescer:
+            results = await asyncio.gather(
+                coalescer.update('missing', _updater(increment=('n',))),
+                coalescer.update('missing', _updater(increment=('n',))),
+                return_exceptions=True
+            )
+        assert all(isinstance(result, NotFound) for result in results)
+
+    local(test)
@@ -0,0 +1,55 @@
+import array
+
+from deta import Record
+from deta.utils import _Columns
+
+
+def test_columns_of_records():
+    columns = _Columns()
+    columns.extend([{'key': 'a', 'value': 1}, {'key': 'b', 'name': 'x'}])
+    assert columns.columns == {'key': ['a', 'b'], 'value': [1, None], 'name': [None, 'x']}
+
+
+def test_late_fields_are_padded():
+    columns = _Columns(typed=True)
+    columns.extend([{'key': 'a', 'value': 1}])
+    columns.extend([{'key': 'b', 'value': 2, 'count': 3}])
+    assert columns.columns['value'] == array.array('q', [1, 2])
+    assert columns.columns['count'] == [None, 3]
+
+
+def test_typed_columns_are_promoted():
+    columns = _Columns(['value', 'name', 'big'], typed=True)
+    columns.extend([{'value': 1, 'name': 'a', 'big': 1}])
+    columns.extend([{'value': 1.5, 'name': 'b', 'big': 2 ** 70}])
+    columns.extend([{'value': 2, 'big': 3}])
+    assert columns.columns['value'] == array.array('d', [1.0, 1.5, 2.0])
+    assert columns.columns['name'] == ['a', 'b', None]
+    assert columns.columns['big'] == [1, 2 ** 70, 3]
+
+
+def test_fetch_columnar(local):
+    async def test(server, deta):
+        base = deta.base('columnar')
+        await base.put(Record(key='a', value=1), Record(key='b', value=2))
+        result = await base.fetch(columnar=True, fields=['key', 'value'], typed=True)
+        assert result['paging'] == {'size': 2}
+        assert result['items'] == {'key': ['a', 'b'], 'value': array.array('q', [1, 2])}
+
+    local(test)
+
+
+def test_fetch_all_columnar(local):
+    async def test(server, deta):
+        base = deta.base('columnar')
+        await base.put_many([Record(key=f'{i:04d}', value=i, score=i / 2) for i in range(1500)])
+        columns = await base.fetch_all(columnar=True, fields=['value', 'score'], typed=True)
+        assert set(columns) == {'value', 'score'}
+        assert columns['value'] == array.array('q', range(1500))
+        assert columns['score'].typecode == 'd' and len(columns['score']) == 1500
+
+        parallel = await base.fetch_all(columnar=True, partitions=['00', '01'])
+        assert sorted(parallel['key']) == [f'{i:04d}' for i in range(200)]
+        assert len(parallel['value']) == 200
+
+    local(test)
@@ -0,0 +1,40 @@
+import pytest
+
+from deta import Query, Record
+
+
+def test_delete_many(local):
+    async def test(server, deta):
+        base = deta.base('delete')
+        await base.put_many(Record(key=str(i)) for i in range(30))
+        progress = []
+        deleted = await base.delete_many((str(i) for i in range(20)), concurrency=4, on_progress=progress.append)
+        assert deleted == 20
+        assert progress == list(range(1, 21))
+        assert sorted(int(record['key']) for record in await base.fetch_all()) == list(range(20, 30))
+
+    local(test)
+
+
+def test_delete_many_rejects_empty_keys(local):
+    async def test(server, deta):
+        with pytest.raises(ValueError):
+            await deta.base('delete').delete_many(['a', ''])
+
+    local(test)
+
+
+def test_delete_where(local):
+    async def test(server, deta):
+        base = deta.base('delete')
+        await base.put_many(Record(key=f'{i:04d}', odd=i % 2 == 1) for i in range(2100))
+        query = Query()
+        query.equals('odd', True)
+        assert await base.delete_where([query], concurrency=16) == 1050
+        remaining = await base.fetch_all()
+        assert len(remaining) == 1050
+        assert not any(record['odd'] for record in remaining)
+        assert await base.delete_where() == 1050
+        assert await base.fetch_all() == []
+
+    local(test)
@@ -0,0 +1,99 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from deta import Record
+
+RECORDS = [{'key': f'{i:04d}', 'n': i} for i in range(260)]
+
+
+def _keys(lines):
+    return [json.loads(line)['key'] for line in lines]
+
+
+@pytest.mark.parametrize('name', ['export.ndjson', 'export.ndjson.gz'])
+def test_export_resumes_after_interruption(local, tmp_path, name):
+    target, checkpoint = tmp_path / name, tmp_path / 'export.checkpoint'
+
+    async def test(server, deta):
+        base = deta.base('source')
+        await base.put_many(Record.bulk(RECORDS))
+        fetch, calls = base.fetch, 0
+
+        async def flaky(*args, **kwargs):
+            nonlocal calls
+            calls += 1
+            if calls == 3:
+                raise RuntimeError('interrupted')
+            return await fetch(*args, **kwargs)
+
+        base.fetch = flaky
+        with pytest.raises(RuntimeError):
+            await base.export(target, checkpoint=checkpoint, page_size=50)
+        state = json.loads(checkpoint.read_text())
+        assert 0 < state['records'] < len(RECORDS)
+
+        base.fetch = fetch
+        assert await base.export(target, checkpoint=checkpoint, page_size=50) == len(RECORDS)
+        assert not checkpoint.exists()
+
+    local(test)
+    opener = gzip.open if name.endswith('.gz') else open
+    with opener(target, 'rb') as file:
+        assert _keys(file.read().splitlines()) == [record['key'] for record in RECORDS]
+
+
+def test_export_to_file_object(local):
+    buffer = io.BytesIO()
+
+    async def test(server, deta):
+        base = deta.base('source')
+        await base.put_many(Record.bulk(RECORDS))
+        assert await base.export(buffer) == len(RECORDS)
+
+    local(test)
+    assert _keys(buffer.getvalue().splitlines()) == [record['key'] for record in RECORDS]
+
+
+def test_import_resumes_after_interruption(local, tmp_path):
+    source, checkpoint = tmp_path / 'import.ndjson', tmp_path / 'import.checkpoint'
+    source.write_bytes(b''.join(json.dumps(record).encode() + b'\n' for record in RECORDS))
+
+    async def test(server, deta):
+        base = deta.base('target')
+        put, calls = base.put, 0
+
+        async def flaky(*records):
+            nonlocal calls
+            calls += 1
+            if calls == 6:
+                raise RuntimeError('interrupted')
+            return await put(*records)
+
+        base.put = flaky
+        with pytest.raises(RuntimeError):
+            await base.import_(source, checkpoint=checkpoint, concurrency=2)
+        done = json.loads(checkpoint.read_text())['lines']
+        assert done > 0
+
+        base.put = put
+        assert await base.import_(source, checkpoint=checkpoint) == len(RECORDS) - done
+        assert not checkpoint.exists()
+        assert sorted(record['key'] for record in await base.fetch_all()) == [record['key'] for record in RECORDS]
+
+    local(test)
+
+
+def test_import_skips_lines_of_checkpoint(local, tmp_path):
+    checkpoint = tmp_path / 'import.checkpoint'
+    checkpoint.write_text(json.dumps({'lines': 200}))
+    source = io.BytesIO(b''.join(json.dumps(record).encode() + b'\n' for record in RECORDS))
+
+    async def test(server, deta):
+        base = deta.base('target')
+        assert await base.import_(source, checkpoint=checkpoint) == len(RECORDS) - 200
+        assert len(await base.fetch_all()) == len(RECORDS) - 200
+
+    local(test)
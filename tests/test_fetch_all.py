@@ -0,0 +1,67 @@
+import pytest
+
+from deta import Query, Record
+
+
+async def _fill(base, count=120):
+    await base.put_many(Record(key=f'{i:04d}', n=i, group=('a', 'b', 'c')[i % 3]) for i in range(count))
+
+
+def _query(**conditions):
+    query = Query()
+    for field, value in conditions.items():
+        query.equals(field, value)
+    return query
+
+
+def test_sequential(local):
+    async def test(server, deta):
+        base = deta.base('fetch_all')
+        await _fill(base, 2500)
+        records = await base.fetch_all()
+        assert [record['n'] for record in records] == list(range(2500))
+
+    local(test)
+
+
+def test_parallel_matches_sequential(local):
+    async def test(server, deta):
+        base = deta.base('fetch_all')
+        await _fill(base)
+        queries = [_query(group='a'), _query(group='b')]
+        sequential = await base.fetch_all(queries)
+        parallel = await base.fetch_all(queries, parallel=True)
+        assert sorted(record['key'] for record in parallel) == [record['key'] for record in sequential]
+
+    local(test)
+
+
+def test_parallel_drops_duplicates(local):
+    async def test(server, deta):
+        base = deta.base('fetch_all')
+        await _fill(base)
+        records = await base.fetch_all([_query(group='a'), _query(group='a', n=3), Query()], parallel=True)
+        assert len(records) == 120
+        assert len({record['key'] for record in records}) == 120
+
+    local(test)
+
+
+def test_partitions(local):
+    async def test(server, deta):
+        base = deta.base('fetch_all')
+        await _fill(base)
+        by_prefix = await base.fetch_all(partitions=['00', '01'])
+        assert sorted(record['key'] for record in by_prefix) == [f'{i:04d}' for i in range(120)]
+        by_range = await base.fetch_all([_query(group='b')], partitions=[('0000', '0049'), ('0050', '9999')])
+        assert sorted(record['n'] for record in by_range) == list(range(1, 120, 3))
+
+    local(test)
+
+
+def test_partitions_of_key_query(local):
+    async def test(server, deta):
+        with pytest.raises(ValueError):
+            await deta.base('fetch_all').fetch_all([_query(key='0001')], partitions=['0'])
+
+    local(test)
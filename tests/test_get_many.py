@@ -0,0 +1,49 @@
+import pytest
+
+from deta import Cache, Record
+
+
+def test_every_key_is_mapped(local):
+    async def test(server, deta):
+        base = deta.base('get_many')
+        await base.put_many(Record(key=str(i), n=i) for i in range(10))
+        result = await base.get_many(['3', 'missing', '7', '3'])
+        assert list(result) == ['3', 'missing', '7']
+        assert result['3']['n'] == 3
+        assert result['7']['n'] == 7
+        assert result['missing'] is None
+
+    local(test)
+
+
+def test_keys_are_looked_up_in_chunks(local):
+    async def test(server, deta):
+        base = deta.base('get_many')
+        await base.put_many(Record(key=f'{i:03d}') for i in range(250))
+        requests = server.requests
+        result = await base.get_many([f'{i:03d}' for i in range(250)], chunk_size=100)
+        assert all(record is not None for record in result.values())
+        assert server.requests == requests + 3
+
+    local(test)
+
+
+def test_cached_keys_are_not_looked_up(local):
+    async def test(server, deta):
+        base = deta.base('get_many', cache=Cache(negative_ttl=60))
+        await base.put(Record(key='a'))
+        await base.get_many(['a', 'b'])
+        requests = server.requests
+        assert await base.get_many(['a', 'b']) == {'a': {'key': 'a'}, 'b': None}
+        assert server.requests == requests
+
+    local(test)
+
+
+@pytest.mark.parametrize('keys, options', [(['a', ''], {}), (['a'], {'chunk_size': 0})])
+def test_invalid_arguments(local, keys, options):
+    async def test(server, deta):
+        with pytest.raises(ValueError):
+            await deta.base('get_many').get_many(keys, **options)
+
+    local(test)
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from deta import DetaUnknownError, MetricsCollector, NotFound, Record, RetryPolicy
+
+
+def test_events_describe_requests(local):
+    events = []
+
+    async def test(server, deta):
+        base = deta.base('hooks')
+        await base.put(Record(key='a'))
+        with pytest.raises(NotFound):
+            await base.get('b')
+        put, get = events
+        assert (put.operation, put.target, put.method, put.status) == ('base.put', 'hooks', 'PUT', 207)
+        assert put.request_bytes > 0 and put.attempts == 1 and put.error is None
+        assert (get.operation, get.status) == ('base.get', 404)
+        assert put.latency > 0
+
+    local(test, hooks=[events.append])
+
+
+def test_events_count_attempts_and_errors(local):
+    events = []
+
+    async def test(server, deta):
+        with pytest.raises(DetaUnknownError):
+            await deta.base('hooks').get('a')
+        event, = events
+        assert event.attempts == 3
+        assert event.status == 503
+
+    local(test, server={'error_rate': 1.0}, retry=RetryPolicy(3, base_delay=0.001), hooks=[events.append])
+
+
+def test_hooks_can_be_added_later(local):
+    events = []
+
+    async def test(server, deta):
+        base = deta.base('hooks')
+        await base.put(Record(key='a'))
+        deta.hooks.append(events.append)
+        await base.get('a')
+        assert [event.operation for event in events] == ['base.get']
+
+    local(test)
+
+
+def test_metrics_collector(local):
+    metrics = MetricsCollector(buckets=(0.001, 10.0))
+
+    async def test(server, deta):
+        base = deta.base('hooks')
+        for key in 'abc':
+            await base.put(Record(key=key))
+        with pytest.raises(NotFound):
+            await base.get('d')
+        get, put = sorted(metrics.snapshot(), key=lambda series: series['operation'])
+        assert (get['operation'], get['count'], get['errors'], get['statuses']) == ('base.get', 1, 1, {'404': 1})
+        assert (put['operation'], put['target'], put['count'], put['errors']) == ('base.put', 'hooks', 3, 0)
+        assert sum(put['latency_buckets'].values()) == 3
+        assert metrics.quantile('base.put', 0.5) in (0.001, 10.0)
+        assert metrics.quantile('base.delete', 0.5) is None
+
+        text = metrics.prometheus()
+        assert '# TYPE deta_request_duration_seconds histogram' in text
+        assert 'deta_requests_total{operation="base.put",target="hooks",status="207"} 3' in text
+        assert 'deta_request_duration_seconds_bucket{operation="base.put",target="hooks",le="+Inf"} 3' in text
+
+        metrics.reset()
+        assert metrics.snapshot() == []
+
+    local(test, hooks=[metrics])
+
+
+def test_failing_hooks_do_not_fail_requests(local):
+    events, errors = [], []
+
+    def failing(event):
+        raise RuntimeError('hook failed')
+
+    async def test(server, deta):
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        base = deta.base('hooks')
+        await base.put(Record(key='a'))
+        assert (await base.get('a'))['key'] == 'a'
+        assert len(events) == 2
+        assert [type(context['exception']) for context in errors] == [RuntimeError, RuntimeError]
+
+    local(test, hooks=[failing, events.append])
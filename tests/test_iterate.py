@@ -0,0 +1,62 @@
+import asyncio
+
+from deta import Query, Record
+
+KEYS = [f'{i:03d}' for i in range(95)]
+
+
+async def _fill(base):
+    await base.put_many(Record(key=key, even=int(key) % 2 == 0) for key in KEYS)
+
+
+def test_records_in_key_order(local):
+    async def test(server, deta):
+        base = deta.base('iterate')
+        await _fill(base)
+        assert [record['key'] async for record in base.iterate(page_size=10)] == KEYS
+        assert [record['key'] async for record in base.iterate(page_size=10, sort=True)] == KEYS[::-1]
+
+    local(test)
+
+
+def test_pages(local):
+    async def test(server, deta):
+        base = deta.base('iterate')
+        await _fill(base)
+        pages = [page async for page in base.iterate(page_size=40, pages=True)]
+        assert [len(page) for page in pages] == [40, 40, 15]
+
+    local(test)
+
+
+def test_queries(local):
+    async def test(server, deta):
+        base = deta.base('iterate')
+        await _fill(base)
+        query = Query()
+        query.equals('even', True)
+        records = [record async for record in base.iterate([query], page_size=7)]
+        assert [record['key'] for record in records] == KEYS[::2]
+
+    local(test)
+
+
+def test_next_page_is_prefetched(local):
+    async def test(server, deta):
+        base = deta.base('iterate')
+        await _fill(base)
+        requests = server.requests
+        iterator = base.iterate(page_size=10)
+        await iterator.__anext__()
+        await asyncio.sleep(0.05)
+        assert server.requests == requests + 2
+        await iterator.aclose()
+
+    local(test)
+
+
+def test_empty_base(local):
+    async def test(server, deta):
+        assert [record async for record in deta.base('empty').iterate()] == []
+
+    local(test)
@@ -0,0 +1,49 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from deta import KeyConflict, Record
+
+
+class _Codec:
+    # json with datetimes as ISO strings, counting its calls
+
+    def __init__(self):
+        self.dumped = 0
+        self.loaded = 0
+
+    def dumps(self, obj):
+        self.dumped += 1
+        return json.dumps(obj, default=lambda value: value.isoformat()).encode('utf-8')
+
+    def loads(self, raw):
+        self.loaded += 1
+        return json.loads(raw)
+
+
+def test_requests_use_custom_dumps_and_loads(local):
+    codec = _Codec()
+
+    async def test(server, deta):
+        base = deta.base('json')
+        await base.put(Record(key='a', at=datetime(2024, 1, 1)))
+        assert codec.dumped == 1
+        assert (await base.get('a'))['at'] == '2024-01-01T00:00:00'
+        assert codec.loaded == 2
+
+    local(test, dumps=codec.dumps, loads=codec.loads)
+
+
+def test_errors_use_custom_loads(local):
+    codec = _Codec()
+
+    async def test(server, deta):
+        base = deta.base('json')
+        await base.insert(Record(key='a'))
+        loaded = codec.loaded
+        with pytest.raises(KeyConflict):
+            await base.insert(Record(key='a'))
+        assert codec.loaded == loaded + 1
+
+    local(test, dumps=codec.dumps, loads=codec.loads)
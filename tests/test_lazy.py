@@ -0,0 +1,40 @@
+import asyncio
+import subprocess
+import sys
+
+from deta import Deta, Record
+
+
+def _imports_aiohttp(code: str) -> bool:
+    result = subprocess.run(
+        [sys.executable, '-c', f'import sys\n{code}\nprint("aiohttp" in sys.modules)'],
+        capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip() == 'True'
+
+
+def test_import_does_not_load_aiohttp():
+    assert not _imports_aiohttp('import deta')
+    assert not _imports_aiohttp('import deta\ndeta.Deta("a_b").base("x")')
+    assert _imports_aiohttp('import deta.testing')
+
+
+def test_client_can_be_created_without_a_loop():
+    deta = Deta('a_b')
+    base, drive = deta.base('lazy'), deta.drive('lazy')
+    assert deta._session is None
+    assert base.name == 'lazy' and drive.name == 'lazy'
+
+    async def main():
+        await deta.close()
+
+    asyncio.run(main())
+
+
+def test_session_is_created_on_first_request(local):
+    async def test(server, deta):
+        assert deta._session is None
+        await deta.base('lazy').put(Record(key='a'))
+        assert deta._session is not None
+
+    local(test)
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from deta import AdaptiveLimiter, Record
+
+
+def _complete(limiter, count, latency=0.01, operation='base.get', **options):
+    async def main():
+        for _ in range(count):
+            await limiter.acquire(operation)
+            limiter.release(operation, latency, **options)
+
+    asyncio.run(main())
+
+
+def test_limit_grows_by_one_per_window():
+    limiter = AdaptiveLimiter(4)
+    _complete(limiter, 4)
+    assert limiter.concurrency == 4
+    _complete(limiter, 1)
+    assert limiter.concurrency == 5
+
+
+def test_limit_is_cut_on_errors():
+    limiter = AdaptiveLimiter(16, min_limit=3)
+    _complete(limiter, 1, latency=None, ok=False)
+    assert limiter.concurrency == 8
+    _complete(limiter, 2, latency=None, ok=False)
+    assert limiter.concurrency == 3
+
+
+def test_limit_is_cut_on_slow_responses():
+    limiter = AdaptiveLimiter(16)
+    _complete(limiter, 1, latency=0.01)
+    _complete(limiter, 1, latency=0.015)
+    assert limiter.concurrency == 16
+    _complete(limiter, 1, latency=0.1)
+    assert limiter.concurrency == 8
+    # other operations keep their own baseline
+    _complete(limiter, 1, latency=0.1, operation='drive.get')
+    assert limiter.concurrency == 8
+
+
+def test_latency_target():
+    limiter = AdaptiveLimiter(16, latency_target=0.05)
+    _complete(limiter, 1, latency=0.04)
+    assert limiter.concurrency == 16
+    _complete(limiter, 1, latency=0.06)
+    assert limiter.concurrency == 8
+
+
+def test_one_window_of_slow_responses_counts_once():
+    limiter = AdaptiveLimiter(16)
+    _complete(limiter, 1, latency=0.01)
+    _complete(limiter, 3, latency=10.0)
+    assert limiter.concurrency == 8
+
+
+def test_limit_is_bounded_above():
+    limiter = AdaptiveLimiter(2, max_limit=3)
+    _complete(limiter, 20)
+    assert limiter.concurrency == 3
+
+
+def test_waiters_are_let_through_by_priority():
+    limiter = AdaptiveLimiter(1, max_limit=1, priorities={'base.get': 10, 'drive.get': -10})
+    order = []
+
+    async def request(operation, **options):
+        await limiter.acquire(operation, **options)
+        order.append(options.get('priority', operation))
+        await asyncio.sleep(0)
+        limiter.release(operation)
+
+    async def main():
+        await limiter.acquire('base.put')
+        tasks = [
+            asyncio.ensure_future(request('drive.get')),
+            asyncio.ensure_future(request('base.put')),
+            asyncio.ensure_future(request('base.get')),
+            asyncio.ensure_future(request('base.put', priority=20)),
+        ]
+        await asyncio.sleep(0)
+        assert limiter.waiting == 4
+        limiter.release('base.put')
+        await asyncio.gather(*tasks)
+        assert limiter.in_flight == 0
+
+    asyncio.run(main())
+    assert order == [20, 'base.get', 'base.put', 'drive.get']
+
+
+def test_cancelled_waiters_give_up_their_turn():
+    limiter = AdaptiveLimiter(1, max_limit=1)
+
+    async def main():
+        await limiter.acquire()
+        cancelled = asyncio.ensure_future(limiter.acquire())
+        waiting = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        limiter.release()
+        await waiting
+        assert limiter.in_flight == 1
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize('options', [
+    {'initial': 0},
+    {'initial': 4, 'min_limit': 5},
+    {'initial': 8, 'max_limit': 4},
+    {'backoff': 1.0},
+    {'backoff': 0.0},
+])
+def test_invalid_settings(options):
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(**options)
+
+
+def test_requests_take_slots(local):
+    limiter = AdaptiveLimiter(2, max_limit=2)
+
+    async def test(server, deta):
+        base = deta.base('limiter')
+        await asyncio.gather(*(base.put(Record(key=str(i))) for i in range(10)))
+        assert len(await base.fetch_all()) == 10
+        assert limiter.in_flight == 0
+
+    local(test, server={'latency': 0.01}, limiter=limiter)
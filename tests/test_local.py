@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from deta import BadRequest, KeyConflict, NotFound, Query, Record, Updater
+from deta.drive import MAX_UPLOAD_SIZE
+
+
+def test_base_endpoints(local):
+    async def test(server, deta):
+        base = deta.base('local')
+        result = await base.put(Record(key='a', n=1), Record(n=2))
+        assert [item['key'] for item in result['processed']['items']][0] == 'a'
+        with pytest.raises(KeyConflict):
+            await base.insert(Record(key='a'))
+        updater = Updater()
+        updater.increment('n', 2)
+        updater.set('profile.city', 'Paris')
+        await base.update('a', updater)
+        assert await base.get('a') == {'key': 'a', 'n': 3, 'profile': {'city': 'Paris'}}
+        query = Query()
+        query.greater_than('n', 2)
+        assert [record['key'] for record in (await base.fetch([query]))['items']] == ['a']
+        await base.delete('a')
+        with pytest.raises(NotFound):
+            await base.get('a')
+
+    local(test)
+
+
+def test_expired_records_are_hidden(local):
+    async def test(server, deta):
+        base = deta.base('local')
+        await base.put(Record(key='a'))
+        server.bases[('local', 'local')]['a']['__expires'] = time.time() - 1
+        with pytest.raises(NotFound):
+            await base.get('a')
+        assert (await base.fetch())['items'] == []
+        await base.insert(Record(key='a'))
+
+    local(test)
+
+
+def test_drive_endpoints(local):
+    async def test(server, deta):
+        drive = deta.drive('local')
+        for i in range(5):
+            await drive.put(f'content {i}'.encode(), save_as=f'{i}.txt', folder='docs')
+        assert (await drive.files())['names'] == [f'docs/{i}.txt' for i in range(5)]
+        page = await drive.files(limit=2, prefix='docs/')
+        assert page['names'] == ['docs/0.txt', 'docs/1.txt']
+        assert (await drive.files(limit=10, last=page['paging']['last']))['names'][0] == 'docs/2.txt'
+        assert await drive.size_of('docs/3.txt') == 9
+        assert await (await drive.get('docs/3.txt')).read() == b'content 3'
+        assert await (await drive.get('docs/3.txt', _range=(2, 4))).read() == b'nte'
+        with pytest.raises(BadRequest):
+            await drive.get('docs/3.txt', _range=(100, 200))
+        await drive.delete('docs/3.txt')
+        with pytest.raises(NotFound):
+            await drive.size_of('docs/3.txt')
+        with pytest.raises(NotFound):
+            await drive.get('docs/3.txt')
+
+    local(test)
+
+
+def test_chunked_upload(local):
+    async def test(server, deta):
+        drive = deta.drive('local')
+        content = bytes(range(256)) * (MAX_UPLOAD_SIZE // 256 + 1000)
+        await drive.put(content, save_as='large.bin')
+        assert await drive.size_of('large.bin') == len(content)
+        assert await (await drive.get('large.bin')).read() == content
+
+    local(test)
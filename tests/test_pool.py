@@ -0,0 +1,68 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from deta import Deta, PoolConfig, Record
+
+
+def test_pool_settings(local):
+    async def test(server, deta):
+        await deta.base('pool').put(Record(key='a'))
+        connector = deta.session.connector
+        assert connector.limit == 7
+        assert connector.limit_per_host == 3
+        assert deta.session.timeout.sock_read == 2
+        assert deta.drive_session is deta.session
+
+    local(test, pool=PoolConfig(limit=7, limit_per_host=3, read_timeout=2))
+
+
+def test_separate_drive_pool(local):
+    async def test(server, deta):
+        await deta.drive('pool').put(b'1', save_as='a')
+        assert deta.drive_session is not deta.session
+        assert deta.drive_session.connector.limit == 2
+        await deta.base('pool').put(Record(key='a'))
+
+    local(test, drive_pool=PoolConfig(limit=2))
+
+
+def test_shared_connector_outlives_clients(local):
+    async def test(server, deta):
+        connector = PoolConfig(limit=5).connector()
+        for _ in range(2):
+            async with server.client(connector=connector) as client:
+                await client.base('pool').put(Record(key='a'))
+        assert not connector.closed
+        await connector.close()
+
+    local(test)
+
+
+def test_pool_with_external_session():
+    async def main():
+        async with aiohttp.ClientSession() as session:
+            with pytest.raises(ValueError):
+                Deta('local_key', session=session, pool=PoolConfig())
+
+    asyncio.run(main())
+
+
+def test_pool_keeps_a_total_timeout(local):
+    async def test(server, deta):
+        await deta.base('pool').put(Record(key='a'))
+        assert deta.session.timeout.total == 300
+
+    local(test, pool=PoolConfig(limit=5))
+
+
+def test_shared_connector_keeps_a_total_timeout(local):
+    async def test(server, deta):
+        connector = PoolConfig().connector()
+        async with server.client(connector=connector) as client:
+            await client.base('pool').put(Record(key='a'))
+            assert client.session.timeout.total == 300
+        await connector.close()
+
+    local(test)
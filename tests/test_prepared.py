@@ -0,0 +1,88 @@
+import json
+from datetime import datetime
+
+from deta import PreparedQuery, Query, QueryCache, Record
+
+
+def _query(**conditions):
+    query = Query()
+    for field, value in conditions.items():
+        query.equals(field, value)
+    return query
+
+
+def test_duplicates_are_dropped():
+    assert PreparedQuery.normalise([_query(a=1, b=2), _query(b=2, a=1)]) == [{'a': 1, 'b': 2}]
+
+
+def test_subsumed_queries_are_dropped():
+    queries = [_query(a=1, b=2), _query(a=1), _query(c={'x': 1})]
+    assert PreparedQuery.normalise(queries) == [{'a': 1}, {'c': {'x': 1}}]
+
+
+def test_empty_query_matches_everything():
+    assert PreparedQuery.normalise([_query(a=1), Query()]) == []
+
+
+def test_fields_and_queries_are_sorted():
+    normalised = PreparedQuery.normalise([_query(z=1, b=2), _query(a=3)])
+    assert normalised == [{'a': 3}, {'b': 2, 'z': 1}]
+    assert [list(query) for query in normalised] == [['a'], ['b', 'z']]
+
+
+def test_key_ignores_order():
+    first = PreparedQuery([_query(a=1), _query(b=2, c=3)], limit=10)
+    second = PreparedQuery([_query(c=3, b=2), _query(a=1)], limit=10)
+    assert first.key == second.key
+    assert first.key != PreparedQuery([_query(a=1)], limit=10).key
+    assert first.key != PreparedQuery([_query(a=1), _query(b=2, c=3)], limit=10, sort=True).key
+
+
+def test_body_splices_the_cursor():
+    prepared = PreparedQuery([_query(a=1)], limit=5, sort=True)
+    assert json.loads(prepared.body()) == {'query': [{'a': 1}], 'limit': 5, 'sort': 'desc'}
+    assert json.loads(prepared.body('k"1')) == {'query': [{'a': 1}], 'limit': 5, 'sort': 'desc', 'last': 'k"1'}
+
+
+def test_fetch_with_prepared_query(local):
+    async def test(server, deta):
+        base = deta.base('prepared')
+        await base.put_many([Record(key=f'{i:04d}', even=i % 2 == 0) for i in range(1200)])
+        prepared = base.prepare([_query(even=True), _query(even=True, key='0000')])
+        assert prepared.queries == [{'even': True}]
+        page = await base.fetch(prepared)
+        assert len(page['items']) == 600
+        assert len(await base.fetch_all(prepared)) == 600
+
+        paged = base.prepare([_query(even=False)], limit=400)
+        first = await base.fetch(paged)
+        second = await base.fetch(paged, last=first['paging']['last'])
+        assert second['items'][0]['key'] == '0801'
+
+    local(test)
+
+
+def _dumps(obj):
+    return json.dumps(obj, default=lambda value: value.isoformat())
+
+
+def test_values_are_left_to_the_encoder():
+    encode = lambda obj: _dumps(obj).encode('utf-8')
+    queries = [_query(at=datetime(2024, 1, 1)), _query(at=datetime(2024, 1, 1), n=1), _query(at=5)]
+    prepared = PreparedQuery(queries, encode=encode)
+    assert prepared.queries == [{'at': datetime(2024, 1, 1)}, {'at': 5}]
+    assert json.loads(prepared.body()) == {'query': [{'at': '2024-01-01T00:00:00'}, {'at': 5}]}
+
+
+def test_query_cache_with_custom_dumps(local):
+    async def test(server, deta):
+        base = deta.base('prepared', query_cache=QueryCache())
+        await base.put(Record(key='a', at='2024-01-01T00:00:00'))
+        queries = [_query(at=datetime(2024, 1, 1))]
+        assert len(base.prepare(queries).queries) == 1
+        assert len((await base.fetch(queries))['items']) == 1
+        requests = server.requests
+        assert len((await base.fetch(queries))['items']) == 1
+        assert server.requests == requests
+
+    local(test, dumps=_dumps)
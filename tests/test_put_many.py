@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from deta import BadRequest, Record, Unauthorized
+from deta.utils import _gather_bounded
+
+
+def test_records_are_put_in_batches(local):
+    async def test(server, deta):
+        base = deta.base('put_many')
+        requests = server.requests
+        result = await base.put_many(Record(key=f'{i:03d}', n=i) for i in range(60))
+        assert server.requests == requests + 3
+        assert sorted(item['key'] for item in result['processed']['items']) == [f'{i:03d}' for i in range(60)]
+        assert result['failed']['items'] == []
+        assert len(await base.fetch_all()) == 60
+
+    local(test)
+
+
+def test_async_iterable_of_records(local):
+    async def records():
+        for i in range(30):
+            yield Record(key=str(i))
+
+    async def test(server, deta):
+        base = deta.base('put_many')
+        result = await base.put_many(records())
+        assert len(result['processed']['items']) == 30
+
+    local(test)
+
+
+def test_concurrency_is_bounded(local):
+    async def test(server, deta):
+        base = deta.base('put_many')
+        put, running, peak = base.put, 0, 0
+
+        async def counting(*records):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            try:
+                await asyncio.sleep(0.01)
+                return await put(*records)
+            finally:
+                running -= 1
+
+        base.put = counting
+        await base.put_many((Record(key=str(i)) for i in range(250)), concurrency=3)
+        assert peak == 3
+
+    local(test)
+
+
+def test_failed_batch_keeps_other_results(local):
+    async def test(server, deta):
+        base = deta.base('put_many')
+        put = base.put
+
+        async def flaky(*records):
+            if records[0].key == '025':
+                raise BadRequest('invalid item')
+            return await put(*records)
+
+        base.put = flaky
+        result = await base.put_many(Record(key=f'{i:03d}') for i in range(75))
+        assert len(result['processed']['items']) == 50
+        failed = [f'{i:03d}' for i in range(25, 50)]
+        assert [item['key'] for item in result['failed']['items']] == failed
+        [error] = result['failed']['errors']
+        assert isinstance(error['error'], BadRequest)
+        assert [item['key'] for item in error['items']] == failed
+
+    local(test)
+
+
+def test_invalid_key_stops_all_batches(local):
+    async def test(server, deta):
+        base = deta.base('put_many')
+        calls = 0
+
+        async def unauthorized(*records):
+            nonlocal calls
+            calls += 1
+            raise Unauthorized('Invalid API key')
+
+        base.put = unauthorized
+        with pytest.raises(Unauthorized):
+            await base.put_many((Record(key=str(i)) for i in range(1000)), concurrency=2)
+        assert calls <= 3
+
+    local(test)
+
+
+def test_programming_errors_are_raised(local):
+    async def test(server, deta):
+        with pytest.raises(TypeError):
+            await deta.base('put_many').put_many([Record(key='1', value=object())])
+
+    local(test)
+
+
+def test_invalid_concurrency(local):
+    async def test(server, deta):
+        with pytest.raises(ValueError):
+            await deta.base('put_many').put_many([Record(key='1')], concurrency=0)
+
+    local(test)
+
+
+def test_gather_bounded_cancels_on_first_error():
+    async def main():
+        started, cancelled = [], []
+
+        async def work(i):
+            started.append(i)
+            try:
+                await asyncio.sleep(0.01 if i == 2 else 1)
+            except asyncio.CancelledError:
+                cancelled.append(i)
+                raise
+            raise KeyError(i)
+
+        with pytest.raises(KeyError):
+            await _gather_bounded(work, range(100), 4)
+        await asyncio.sleep(0)
+        assert started == [0, 1, 2, 3]
+        assert sorted(cancelled) == [0, 1, 3]
+
+    asyncio.run(main())
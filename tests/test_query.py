@@ -0,0 +1,99 @@
+import pytest
+
+from deta import Query
+
+RECORD = {
+    'key': 'k1',
+    'name': 'alice',
+    'age': 30,
+    'score': 2.5,
+    'active': True,
+    'tags': ['a', 'b', 1],
+    'profile': {'city': 'Paris', 'zip': '75001'},
+}
+
+
+def _matches(operator, field, *args, record=RECORD):
+    query = Query()
+    getattr(query, operator)(field, *args)
+    return query.compile()(record)
+
+
+@pytest.mark.parametrize('operator, field, args, expected', [
+    ('equals', 'name', ('alice',), True),
+    ('equals', 'name', ('bob',), False),
+    ('equals', 'profile.city', ('Paris',), True),
+    ('equals', 'profile', ({'city': 'Paris', 'zip': '75001'},), True),
+    ('equals', 'missing', (None,), False),
+    ('equals', 'active', (1,), False),
+    ('equals', 'age', (30.0,), True),
+    ('not_equals', 'name', ('bob',), True),
+    ('not_equals', 'name', ('alice',), False),
+    ('not_equals', 'missing', ('x',), True),
+    ('not_equals', 'active', (1,), True),
+    ('greater_than', 'age', (29,), True),
+    ('greater_than', 'age', (30,), False),
+    ('greater_than', 'name', ('al',), True),
+    ('greater_than', 'name', (1,), False),
+    ('greater_than', 'missing', (0,), False),
+    ('greater_than', 'active', (0,), False),
+    ('greater_equal', 'age', (30,), True),
+    ('less_than', 'score', (3,), True),
+    ('less_equal', 'score', (2.5,), True),
+    ('less_equal', 'score', (2,), False),
+    ('contains', 'name', ('lic',), True),
+    ('contains', 'name', (1,), False),
+    ('contains', 'tags', ('b',), True),
+    ('contains', 'tags', (True,), False),
+    ('contains', 'tags', (1,), True),
+    ('contains', 'missing', ('a',), False),
+    ('not_contains', 'tags', ('c',), True),
+    ('not_contains', 'tags', ('a',), False),
+    ('not_contains', 'missing', ('a',), True),
+    ('range', 'age', (30, 40), True),
+    ('range', 'age', (10, 29), False),
+    ('range', 'name', ('a', 'b'), True),
+    ('prefix', 'profile.zip', ('75',), True),
+    ('prefix', 'age', ('3',), False),
+])
+def test_operators(operator, field, args, expected):
+    assert _matches(operator, field, *args) is expected
+
+
+def test_all_conditions_must_hold():
+    query = Query()
+    query.equals('name', 'alice')
+    query.greater_than('age', 40)
+    assert not query.compile()(RECORD)
+    query.greater_than('age', 20)
+    assert query.compile()(RECORD)
+    assert not query.compile()({'name': 'alice', 'age': 10})
+
+
+def test_compiled_predicate_is_not_affected_by_later_changes():
+    query = Query()
+    query.equals('name', 'alice')
+    predicate = query.compile()
+    query.equals('name', 'bob')
+    assert predicate(RECORD)
+
+
+def test_nested_path_through_non_object():
+    assert not _matches('equals', 'name.first', 'alice')
+
+
+def test_unknown_operator():
+    query = Query()
+    query._payload['age?between'] = [1, 2]
+    with pytest.raises(ValueError):
+        query.compile()
+
+
+def test_compile_any():
+    alice, bob = Query(), Query()
+    alice.equals('name', 'alice')
+    bob.equals('name', 'bob')
+    assert Query.compile_any([bob, alice])(RECORD)
+    assert not Query.compile_any([bob])(RECORD)
+    assert Query.compile_any([])(RECORD)
+    assert Query.compile_any(None)({})
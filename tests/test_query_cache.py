@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from deta import Query, QueryCache, Record
+from deta.cache import _MISSING
+
+
+def _query(**conditions):
+    query = Query()
+    for field, value in conditions.items():
+        query.equals(field, value)
+    return query
+
+
+def test_size_is_bounded_in_bytes():
+    cache = QueryCache(max_bytes=100)
+    cache._put('a', 1, 60, cache.generation)
+    cache._put('b', 2, 60, cache.generation)
+    assert cache._get('a') == (_MISSING, None)
+    assert cache.nbytes == 60 and len(cache) == 1
+    cache._put('c', 3, 101, cache.generation)
+    assert 'c' not in cache._entries
+    assert cache.stats()['evictions'] == 1
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        QueryCache(max_bytes=0)
+
+
+def test_results_are_served_from_cache(local):
+    async def test(server, deta):
+        base = deta.base('query_cache', query_cache=QueryCache())
+        await base.put(Record(key='a', n=1), Record(key='b', n=2))
+        requests = server.requests
+        assert len((await base.fetch([_query(n=1)]))['items']) == 1
+        assert len((await base.fetch([_query(n=1), _query(n=1)]))['items']) == 1
+        assert len((await base.fetch(base.prepare([_query(n=1)])))['items']) == 1
+        assert server.requests == requests + 1
+        assert len((await base.fetch([_query(n=2)]))['items']) == 1
+        assert server.requests == requests + 2
+        assert base.query_cache.stats()['hits'] == 2
+
+    local(test)
+
+
+def test_writes_invalidate_cached_queries(local):
+    async def test(server, deta):
+        base = deta.base('query_cache', query_cache=QueryCache())
+        await base.put(Record(key='a'))
+        assert len((await base.fetch())['items']) == 1
+        requests = server.requests
+        assert len((await base.fetch())['items']) == 1
+        assert server.requests == requests
+
+        await base.put(Record(key='b'))
+        assert len((await base.fetch())['items']) == 2
+
+    local(test)
+
+
+def test_stale_results_are_served_while_refreshing(local):
+    async def test(server, deta):
+        base = deta.base('query_cache', query_cache=QueryCache(ttl=0.05, stale_ttl=10))
+        # writes through another base don't invalidate the cache
+        other = deta.base('query_cache')
+        await other.put(Record(key='a'))
+        assert len((await base.fetch())['items']) == 1
+        await other.put(Record(key='b'))
+        await asyncio.sleep(0.06)
+
+        requests = server.requests
+        assert len((await base.fetch())['items']) == 1
+        assert len((await base.fetch())['items']) == 1
+        await asyncio.sleep(0.02)
+        assert server.requests == requests + 1
+        assert len((await base.fetch())['items']) == 2
+        assert base.query_cache.stats()['stale_hits'] == 2
+
+    local(test)
+
+
+def test_fetch_overlapping_a_write_is_not_cached(local, hold_reads):
+    async def test(server, deta):
+        base = deta.base('query_cache', query_cache=QueryCache())
+        await base.put(Record(key='a'))
+        answered, release = hold_reads(base, 'fetch')
+        fetch = asyncio.ensure_future(base.fetch())
+        await answered.wait()
+        await base.put(Record(key='b'))
+        release.set()
+        assert len((await fetch)['items']) == 1
+        assert len(base.query_cache) == 0
+        assert len((await base.fetch())['items']) == 2
+
+    local(test)
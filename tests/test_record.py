@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from deta import Record
+
+
+def test_bulk_from_rows():
+    rows = [{'key': 'a', 'value': 1}, {'value': 2}]
+    a, b = Record.bulk(rows)
+    assert (a.key, a.payload) == ('a', {'key': 'a', 'value': 1})
+    assert b.key is None and b.payload == {'value': 2}
+    # rows are used as they are
+    assert a.payload is rows[0]
+
+
+def test_bulk_from_columns():
+    records = Record.bulk({'key': ['a', 'b'], 'value': [1, 2]})
+    assert [record.payload for record in records] == [{'key': 'a', 'value': 1}, {'key': 'b', 'value': 2}]
+
+
+def test_bulk_key_field():
+    record, = Record.bulk([{'id': 'a', 'value': 1}], key_field='id')
+    assert record.key == 'a'
+    assert record.payload == {'id': 'a', 'value': 1, 'key': 'a'}
+
+
+def test_bulk_expiry():
+    records = Record.bulk([{'key': 'a'}, {'key': 'b'}], expire_after=60)
+    expires = {record.payload['__expires'] for record in records}
+    assert len(expires) == 1
+    assert abs(expires.pop() - (time.time() + 60)) < 2
+    assert records[0].expire_after == 60
+
+
+def test_bulk_matches_records():
+    bulk, = Record.bulk([{'key': 'a', 'value': 1}])
+    record = Record('a', value=1)
+    assert [getattr(bulk, name) for name in Record.__slots__] == [getattr(record, name) for name in Record.__slots__]
+
+
+def test_expiry_options_are_mutually_exclusive():
+    with pytest.raises(ValueError):
+        Record.bulk([{'key': 'a'}], expire_at=time.time(), expire_after=60)
+    with pytest.raises(ValueError):
+        Record('a', expire_at=time.time(), expire_after=60)
+
+
+def test_records_have_no_dict():
+    with pytest.raises(AttributeError):
+        Record('a').extra = 1
+
+
+def test_bulk_records_can_be_put(local):
+    async def test(server, deta):
+        base = deta.base('record')
+        await base.put(*Record.bulk({'key': ['a', 'b'], 'value': [1, 2]}))
+        assert (await base.get('b'))['value'] == 2
+
+    local(test)
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+
+from deta import Record, RetryPolicy, Updater, DetaUnknownError
+from deta.drive import MAX_UPLOAD_SIZE
+
+FAILING = {'error_rate': 1.0}
+
+
+def _policy(**options):
+    return RetryPolicy(3, base_delay=0.001, **options)
+
+
+def test_transient_errors_are_retried(local):
+    async def test(server, deta):
+        base = deta.base('retry')
+        for i in range(20):
+            await base.put(Record(key=str(i)))
+        assert len(await base.fetch_all()) == 20
+        assert server.requests > 21
+
+    local(test, server={'error_rate': 0.3, 'seed': 1}, retry=RetryPolicy(10, base_delay=0.001))
+
+
+def test_attempts_are_bounded(local):
+    async def test(server, deta):
+        with pytest.raises(DetaUnknownError):
+            await deta.base('retry').put(Record(key='1'))
+        assert server.requests == 3
+
+    local(test, server=FAILING, retry=_policy())
+
+
+def test_retry_after_is_respected(local):
+    events = []
+
+    async def test(server, deta):
+        with pytest.raises(DetaUnknownError):
+            await deta.base('retry').get('1')
+        assert events[0].attempts == 2
+        assert events[0].latency >= 0.05
+
+    local(test, server={**FAILING, 'retry_after': 0.05}, retry=RetryPolicy(2), hooks=[events.append])
+
+
+def test_deadline_stops_retries(local):
+    async def test(server, deta):
+        with pytest.raises(DetaUnknownError):
+            await deta.base('retry').get('1')
+        assert server.requests == 1
+
+    local(test, server={**FAILING, 'retry_after': 1}, retry=_policy(deadline=0.5))
+
+
+def test_insert_is_not_retried(local):
+    async def test(server, deta):
+        with pytest.raises(DetaUnknownError):
+            await deta.base('retry').insert(Record(key='1'))
+        assert server.requests == 1
+
+    local(test, server=FAILING, retry=_policy())
+
+
+def test_non_idempotent_update_is_not_retried(local):
+    async def test(server, deta):
+        base = deta.base('retry')
+        updater = Updater()
+        updater.set('name', 'a')
+        with pytest.raises(DetaUnknownError):
+            await base.update('1', updater)
+        assert server.requests == 3
+        updater.increment('count')
+        with pytest.raises(DetaUnknownError):
+            await base.update('1', updater)
+        assert server.requests == 4
+
+    local(test, server=FAILING, retry=_policy())
+
+
+def test_chunked_upload_start_is_not_retried(local):
+    async def test(server, deta):
+        with pytest.raises(DetaUnknownError):
+            await deta.drive('retry').put(bytes(MAX_UPLOAD_SIZE + 1), save_as='large.bin')
+        assert server.requests == 1
+
+    local(test, server=FAILING, retry=_policy())
+
+
+def test_backoff_grows_and_is_capped():
+    policy = RetryPolicy(base_delay=0.1, max_delay=0.3)
+    for attempt, bound in [(1, 0.1), (2, 0.2), (3, 0.3), (10, 0.3)]:
+        assert all(0 <= policy.backoff(attempt) <= bound for _ in range(100))
+
+
+def test_invalid_attempts():
+    with pytest.raises(ValueError):
+        RetryPolicy(0)
+
+
+@pytest.mark.parametrize('idempotent', [True, False])
+def test_deadline_bounds_a_slow_attempt(local, idempotent):
+    async def test(server, deta):
+        base = deta.base('retry')
+        started = time.perf_counter()
+        with pytest.raises(asyncio.TimeoutError):
+            if idempotent:
+                await base.get('1')
+            else:
+                await base.insert(Record(key='1'))
+        assert time.perf_counter() - started < 0.5
+
+    local(test, server={'latency': 1}, retry=_policy(deadline=0.1))
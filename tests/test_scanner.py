@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from deta import Record
+from deta.http import _ItemScanner
+
+PAGE = {
+    "paging": {"size": 3, "last": "c"},
+    "items": [
+        {"key": "a", "text": "brackets ] } [ { and , : inside"},
+        {"key": "b", "text": "escaped \" quote and \\ backslash", "nested": {"list": [1, [2, 3]], "x": None}},
+        {"key": "c", "unicode": "é中", "empty": [], "obj": {}},
+    ],
+    "count": 3,
+}
+
+
+def _scan(body: bytes, chunk_size: int, field: bytes = b'items'):
+    scanner = _ItemScanner(field)
+    items = []
+    for i in range(0, len(body), chunk_size):
+        items.extend(json.loads(raw) for raw in scanner.feed(body[i:i + chunk_size]))
+    fields = {key.decode(): json.loads(bytes(value)) for key, value in scanner.fields.items()}
+    return items, fields
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64, 1 << 20])
+@pytest.mark.parametrize('indent', [None, 2])
+def test_items_and_fields_across_chunks(chunk_size, indent):
+    body = json.dumps(PAGE, indent=indent).encode()
+    items, fields = _scan(body, chunk_size)
+    assert items == PAGE['items']
+    assert fields == {"paging": PAGE["paging"], "count": 3}
+
+
+def test_empty_items():
+    items, fields = _scan(b'{"items": [], "paging": {"size": 0}}', 1)
+    assert items == []
+    assert fields == {"paging": {"size": 0}}
+
+
+def test_other_field():
+    body = json.dumps({"names": ["a", "b"], "items": [1]}).encode()
+    items, fields = _scan(body, 2, field=b'names')
+    assert items == ["a", "b"]
+    assert fields == {"items": [1]}
+
+
+def test_buffer_is_trimmed():
+    scanner = _ItemScanner(b'items')
+    scanner.feed(b'{"items": [')
+    for i in range(1000):
+        scanner.feed(json.dumps({"key": str(i)}).encode() + b',')
+    assert len(scanner._buffer) < 64
+
+
+def test_incremental_iterate_matches_plain(local):
+    async def test(server, deta):
+        base = deta.base('scan')
+        await base.put_many(Record.bulk([{'key': f'{i:04d}', 'text': 'x"y\\z]}' * i} for i in range(60)]))
+        plain = [record async for record in base.iterate(page_size=7)]
+        incremental = [record async for record in base.iterate(page_size=7, incremental=True)]
+        offloaded = [record async for record in base.iterate(page_size=7, incremental=True, offload=True)]
+        assert len(plain) == 60
+        assert plain == incremental == offloaded
+
+    local(test)
@@ -0,0 +1,108 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+from deta import Cache, NotFound, Query, Record
+
+
+def test_identical_reads_share_a_request(local):
+    async def test(server, deta):
+        base = deta.base('flight', coalesce=True)
+        await base.put(Record(key='a'))
+        requests = server.requests
+        records = await asyncio.gather(*(base.get('a') for _ in range(10)))
+        assert server.requests == requests + 1
+        assert all(record is records[0] for record in records)
+
+        query = Query()
+        query.equals('key', 'a')
+        results = await asyncio.gather(*(base.fetch([query]) for _ in range(10)), base.fetch())
+        assert server.requests == requests + 3
+        assert results[0] is results[9]
+
+    local(test, server={'latency': 0.01})
+
+
+def test_reads_are_not_shared_by_default(local):
+    async def test(server, deta):
+        base = deta.base('flight')
+        await base.put(Record(key='a'))
+        requests = server.requests
+        await asyncio.gather(*(base.get('a') for _ in range(5)))
+        assert server.requests == requests + 5
+
+    local(test, server={'latency': 0.01})
+
+
+def test_errors_are_shared(local):
+    async def test(server, deta):
+        base = deta.base('flight', coalesce=True)
+        results = await asyncio.gather(*(base.get('a') for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, NotFound) for result in results)
+        assert server.requests == 1
+
+    local(test, server={'latency': 0.01})
+
+
+def test_cancelled_caller_does_not_cancel_others(local):
+    async def test(server, deta):
+        base = deta.base('flight', coalesce=True)
+        await base.put(Record(key='a'))
+        first = asyncio.ensure_future(base.get('a'))
+        second = asyncio.ensure_future(base.get('a'))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        assert (await second)['key'] == 'a'
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    local(test, server={'latency': 0.02})
+
+
+def test_read_after_a_write_does_not_join_earlier_read(local, hold_reads):
+    async def test(server, deta):
+        base = deta.base('flight', cache=Cache(), coalesce=True)
+        await base.put(Record(key='a', value=1))
+        answered, release = hold_reads(base, 'get')
+        stale = asyncio.ensure_future(base.get('a'))
+        await answered.wait()
+        await base.put(Record(key='a', value=2))
+        fresh = asyncio.ensure_future(base.get('a'))
+        release.set()
+        assert (await stale)['value'] == 1
+        assert (await fresh)['value'] == 2
+        assert (await base.get('a'))['value'] == 2
+
+    local(test)
+
+
+def test_write_drops_fetches_in_flight(local, hold_reads):
+    async def test(server, deta):
+        base = deta.base('flight', coalesce=True)
+        answered, release = hold_reads(base, 'fetch')
+        stale = asyncio.ensure_future(base.fetch())
+        await answered.wait()
+        await base.put(Record(key='a'))
+        fresh = asyncio.ensure_future(base.fetch())
+        release.set()
+        assert (await stale)['items'] == []
+        assert [item['key'] for item in (await fresh)['items']] == ['a']
+
+    local(test)
+
+
+def test_values_only_the_client_encoder_knows(local):
+    def dumps(obj):
+        return json.dumps(obj, default=lambda value: value.isoformat())
+
+    async def test(server, deta):
+        base = deta.base('flight', coalesce=True)
+        query = Query()
+        query.equals('at', datetime(2024, 1, 1))
+        results = await asyncio.gather(base.fetch([query]), base.fetch([query]))
+        assert results[0] is results[1]
+        assert server.requests == 1
+
+    local(test, dumps=dumps)
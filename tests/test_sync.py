@@ -0,0 +1,103 @@
+import concurrent.futures
+import os
+
+import pytest
+
+from deta import NotFound, Record, SyncDeta, Updater
+from deta.sync import _LoopThread
+from deta.testing import LocalDeta
+
+
+@pytest.fixture(scope='module')
+def server():
+    # the server runs on its own loop, as calls of SyncDeta block the calling thread
+    thread = _LoopThread()
+    local_server = LocalDeta()
+    thread.run(local_server.start())
+    yield local_server
+    thread.run(local_server.close())
+    thread.stop()
+
+
+@pytest.fixture
+def sync(server):
+    with SyncDeta('local_key', base_host=server.url, drive_host=server.url) as deta:
+        yield deta
+
+
+def test_calls_block_until_done(sync):
+    base = sync.base('sync')
+    base.put(Record(key='a', value=1))
+    assert base.get('a')['value'] == 1
+    with pytest.raises(NotFound):
+        base.get('b')
+    assert base.name == 'sync'
+
+
+def test_iterate_returns_an_iterator(sync):
+    base = sync.base('sync_iterate')
+    base.put_many([Record(key=f'{i:04d}') for i in range(1200)])
+    keys = [item['key'] for item in base.iterate()]
+    assert keys == [f'{i:04d}' for i in range(1200)]
+    pages = base.iterate(pages=True)
+    assert len(next(pages)) == 1000
+    pages.close()
+
+
+def test_writer_flushes_on_exit(sync):
+    base = sync.base('sync_writer')
+    with base.writer(max_delay_ms=10_000) as writer:
+        futures = [writer.put(Record(key=str(i))) for i in range(3)]
+        assert all(isinstance(future, concurrent.futures.Future) for future in futures)
+    assert all(future.done() for future in futures)
+    assert len(base.fetch_all()) == 3
+
+
+def test_coalescer(sync):
+    base = sync.base('sync_coalescer')
+    base.put(Record(key='a', count=0))
+    with base.coalescer() as coalescer:
+        updater = Updater()
+        updater.increment('count')
+        for _ in range(3):
+            coalescer.update('a', updater)
+    assert base.get('a')['count'] == 3
+
+
+def test_drive_get_returns_content(sync):
+    drive = sync.drive('sync')
+    drive.put(b'hello', save_as='hello.txt')
+    assert drive.get('hello.txt') == b'hello'
+    assert drive.get('hello.txt', _range=(1, 3)) == b'ell'
+
+
+def test_loop_is_restarted_after_close(server):
+    deta = SyncDeta('local_key', base_host=server.url, drive_host=server.url)
+    deta.base('sync_restart').put(Record(key='a'))
+    deta.close()
+    assert deta.base('sync_restart').get('a')['key'] == 'a'
+    deta.close()
+
+
+def test_bases_are_rebound_after_close(sync):
+    base, drive = sync.base('sync_rebind'), sync.drive('sync_rebind')
+    base.put(Record(key='a'))
+    sync.close()
+    assert base.get('a')['key'] == 'a'
+    assert drive.files()['names'] == []
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork')
+def test_bases_work_in_forked_processes(sync):
+    base = sync.base('sync_fork')
+    base.put(Record(key='a'))
+    pid = os.fork()
+    if pid == 0:
+        try:
+            ok = base.get('a')['key'] == 'a'
+        except BaseException:
+            ok = False
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert base.get('a')['key'] == 'a'